@@ -0,0 +1,104 @@
+"""Running roster totals
+Headcount per employee type, per Department (managers) and per Role
+(executives), plus total weekly payroll (sum of calc_pay).  Totals are adjusted
+by the difference each time a setter fires, so reading them never rescans the
+roster.
+"""
+
+import collections
+from typing import *
+
+from employee import *
+
+
+class RosterTotals:
+    """
+    Live totals over a roster.  Register on_change in Employee.LISTENERS to keep them current.
+    """
+    def __init__(self, employees: Iterable[Employee] = ()):
+        """Accepts the employees to count."""
+        # employee -> weekly pay last counted for them
+        self._pay: Dict[Employee, float] = {}
+        self.by_type: Counter = collections.Counter()
+        self.by_department: Counter = collections.Counter()
+        self.by_role: Counter = collections.Counter()
+        self.payroll: float = 0.0
+        # called with no arguments after any total changes
+        self.on_update: Optional[Callable[[], None]] = None
+        self.add_all(employees)
+
+    def __len__(self) -> int:
+        """Returns the headcount."""
+        return len(self._pay)
+
+    def __contains__(self, employee: Employee) -> bool:
+        """Returns True if employee is counted."""
+        return employee in self._pay
+
+    def _count(self, employee: Employee, amount: int) -> None:
+        """Adds amount (1 or -1) to every headcount employee falls under."""
+        self.by_type[type(employee).__name__] += amount
+        if isinstance(employee, Manager):
+            self.by_department[employee.department] += amount
+        if isinstance(employee, Executive):
+            self.by_role[employee.role] += amount
+
+    def _updated(self) -> None:
+        """Calls on_update if it is set."""
+        if self.on_update is not None:
+            self.on_update()
+
+    def add_all(self, employees: Iterable[Employee]) -> None:
+        """Counts every employee not already counted."""
+        for employee in employees:
+            if employee not in self._pay:
+                pay = employee.calc_pay()
+                self._pay[employee] = pay
+                self.payroll += pay
+                self._count(employee, 1)
+        self._updated()
+
+    def add(self, employee: Employee) -> None:
+        """Counts one employee."""
+        self.add_all([employee])
+
+    def remove(self, employee: Employee) -> None:
+        """Stops counting employee."""
+        pay = self._pay.pop(employee, None)
+        if pay is None:
+            return
+        self.payroll -= pay
+        self._count(employee, -1)
+        self._updated()
+
+    def on_change(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback adjusting the totals one change at a time."""
+        if old == new or employee not in self._pay:
+            return
+        if field in ("yearly", "hourly"):
+            pay = employee.calc_pay()
+            self.payroll += pay - self._pay[employee]
+            self._pay[employee] = pay
+        elif field == "department":
+            self.by_department[old] -= 1
+            self.by_department[new] += 1
+        elif field == "role":
+            self.by_role[old] -= 1
+            self.by_role[new] += 1
+        else:
+            return
+        self._updated()
+
+    def summary(self) -> str:
+        """Returns a one line summary: headcount per type and weekly payroll."""
+        types = ", ".join(f"{name} {count}" for name, count in sorted(self.by_type.items()) if count)
+        return f"{len(self)} employees ({types})  |  Weekly payroll ${self.payroll:,.2f}"
+
+    def details(self) -> str:
+        """Returns a multi-line breakdown by department and role."""
+        lines = ["Managers by department:"]
+        lines.extend(f"  {department.name.title().replace('_', ' ')}: {self.by_department[department]}"
+                     for department in Department)
+        lines.append("Executives by role:")
+        lines.extend(f"  {role.name}: {self.by_role[role]}" for role in Role)
+        return "\n".join(lines)
@@ -0,0 +1,147 @@
+"""Background saving
+Saving happens in two steps so the GUI thread never waits on the disk:
+
+1. snapshot() runs on the GUI thread.  Every employee's data file line is cached
+   and only thrown away when one of its setters fires, so a snapshot only
+   re-formats the employees changed since the last one and otherwise just copies
+   references to immutable strings.
+2. A worker thread joins the lines into one buffer, writes it to a temporary
+   file next to the target, fsyncs it and renames it over the target, so a crash
+   mid-save never leaves a half written file.
+
+Snapshots submitted while the worker is busy replace each other, so a burst of
+edits costs one write.
+"""
+
+import os
+import stat
+import tempfile
+import threading
+from typing import *
+
+from employee import *
+
+
+class RowCache(dict):
+    """
+    employee -> its line in the data file (employee.__repr__()), formatted on first use.
+    Register on_change in Employee.LISTENERS so edited employees are re-formatted.
+    """
+    def __missing__(self, employee: Employee) -> str:
+        row = self[employee] = repr(employee)
+        return row
+
+    def on_change(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback dropping the cached line of an edited employee."""
+        self.pop(employee, None)
+
+    def snapshot(self, employees: Iterable[Employee]) -> List[str]:
+        """Returns the data file lines of employees as they are right now."""
+        # map with a bound method stays in C for every employee that is already cached
+        return list(map(self.__getitem__, employees))
+
+
+# os.umask can only be read by setting it, which is not safe once the worker thread runs
+_UMASK: int = os.umask(0)
+os.umask(_UMASK)
+
+
+def target_mode(file_path: str) -> int:
+    """Returns the permission bits of file_path, or those a new file would get under the
+    umask if it does not exist."""
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_atomic(file_path: str, lines: Iterable[str]) -> None:
+    """Writes lines (each followed by a newline) to file_path through a temporary file in the
+    same folder and an atomic rename.  Raises OSError if the write fails; the old file is kept."""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    handle, temporary = tempfile.mkstemp(dir=folder, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as file:
+            file.write("".join(f"{line}\n" for line in lines))
+            file.flush()
+            os.fsync(file.fileno())
+            # mkstemp creates the file private (0600); keep the permissions the target had
+            os.chmod(temporary, target_mode(file_path))
+        os.replace(temporary, file_path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class AutosaveService:
+    """
+    Worker thread writing submitted snapshots to disk, newest snapshot per file wins.
+    """
+    def __init__(self, on_done: Optional[Callable[[], None]] = None):
+        """Accepts an optional function called on the worker thread after every write,
+        successful or not (see take_errors)."""
+        self._on_done: Optional[Callable[[], None]] = on_done
+        self._condition = threading.Condition()
+        # file path -> newest lines waiting to be written
+        self._pending: Dict[str, List[str]] = {}
+        self._busy: bool = False
+        self._errors: List[str] = []
+        self._saves: int = 0
+        self._stopped: bool = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path: str, lines: List[str]) -> None:
+        """Queues lines to be written to file_path, replacing anything still queued for it.
+        Returns immediately."""
+        with self._condition:
+            self._pending[file_path] = lines
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        """Worker loop: waits for snapshots and writes them one at a time."""
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                file_path = next(iter(self._pending))
+                lines = self._pending.pop(file_path)
+                self._busy = True
+            try:
+                write_atomic(file_path, lines)
+            except OSError as error:
+                with self._condition:
+                    self._errors.append(f"Could not save {file_path}: {error}")
+            with self._condition:
+                self._busy = False
+                self._saves += 1
+                self._condition.notify_all()
+            if self._on_done is not None:
+                self._on_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything submitted so far is on disk.
+        Returns False if timeout (seconds) ran out first."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def take_errors(self) -> List[str]:
+        """Returns and forgets the error messages of failed writes."""
+        with self._condition:
+            errors, self._errors = self._errors, []
+        return errors
+
+    @property
+    def saves(self) -> int:
+        """Number of writes finished (successfully or not)."""
+        return self._saves
+
+    def stop(self) -> None:
+        """Writes whatever is still queued, then ends the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
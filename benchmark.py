@@ -0,0 +1,243 @@
+"""Benchmark suite for the HR Management System
+Generates a synthetic roster in the same format save_file writes, then times
+loading, saving, table rendering, form opening, editing and payroll against it.
+Qt scenarios run headless on the offscreen platform.  Results are written as
+JSON so two runs (e.g. two commits) can be compared with --compare.
+
+Usage:
+    python benchmark.py --employees 10000 --images 25 --output before.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import *
+
+# The Qt scenarios must never try to open a real window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Sample images shipped with the repo, copied to build the synthetic image set
+SAMPLE_IMAGES: List[str] = ["placeholder.png", "squidward.jpg", "Screenshot_20.jpg", "myimagei.jpg",
+                            "Goku_image.jpg"]
+FIRST_NAMES: List[str] = ["Ada", "Bob", "Cailyn", "Dana", "Eli", "Fay", "Gus", "Hana", "Ira", "Jack",
+                          "Kermit", "Lena", "Mo", "Nia", "Otto", "Pia", "Quin", "Rae", "Sam", "Tim"]
+LAST_NAMES: List[str] = ["Bellgowan", "Woodring", "Lightner", "Prism", "Forg", "Tentacles", "Smith",
+                         "Nguyen", "Garcia", "Okafor", "Kowalski", "Haddad", "Ivanova", "Tanaka"]
+EMPLOYEE_TYPES: List[str] = ["Executive", "Manager", "Permanent", "Temporary"]
+ROLES: List[str] = ["CEO", "CFO", "CIO"]
+DEPARTMENTS: List[str] = ["ACCOUNTING", "FINANCE", "HR", "R_AND_D", "MACHINING"]
+
+
+def _date_field(day: datetime.date) -> str:
+    """Formats a date the way Permanent/Temporary.__repr__ does, commas swapped for '!'."""
+    return repr(day).replace(",", "!")
+
+
+def generate_row(rng: random.Random, number: int, image: str) -> str:
+    """Accepts a seeded Random, a running number and an image path.
+    Returns one valid employee.data.csv line for a random concrete Employee type."""
+    kind = rng.choice(EMPLOYEE_TYPES)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {number}"
+    email = f"user{number}@acme-machining.com"
+    if kind == "Executive":
+        return f"Executive,{name},{email},{image},{round(rng.uniform(50001, 400000), 2)},Role.{rng.choice(ROLES)}"
+    if kind == "Manager":
+        return (f"Manager,{name},{email},{image},{round(rng.uniform(50001, 250000), 2)},"
+                f"Department.{rng.choice(DEPARTMENTS)}")
+    # hourly types; wage must stay strictly inside (15, 99.99)
+    hourly = round(rng.uniform(15.01, 99.98), 2)
+    day = datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randrange(365 * 30))
+    return f"{kind},{name},{email},{image},{hourly},{_date_field(day)}"
+
+
+def generate_roster(directory: str, employees: int, images: int = 10, seed: int = 0) -> str:
+    """Writes employee.data.csv and an images/ folder into directory.
+    Accepts the number of employees, the number of distinct image files to create
+    (copied round-robin from the sample images) and a random seed.
+    Returns the path of the written data file."""
+    source = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(os.path.join(directory, "images"), exist_ok=True)
+    # the placeholder path is hard coded in Employee so it must always exist
+    shutil.copyfile(os.path.join(source, "placeholder.png"), os.path.join(directory, "images", "placeholder.png"))
+    image_paths = []
+    for number in range(max(images, 1)):
+        sample = SAMPLE_IMAGES[number % len(SAMPLE_IMAGES)]
+        name = f"bench_{number}{os.path.splitext(sample)[1]}"
+        shutil.copyfile(os.path.join(source, sample), os.path.join(directory, "images", name))
+        image_paths.append(f"./images/{name}")
+    rng = random.Random(seed)
+    data_path = os.path.join(directory, "employee.data.csv")
+    with open(data_path, "w") as file:
+        file.writelines(f"{generate_row(rng, number, rng.choice(image_paths))}\n" for number in range(employees))
+    return data_path
+
+
+def measure(function: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Runs function repeat times (calling setup untimed before each run).
+    Returns a dict of the raw run times in seconds plus min/median/mean."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs), "mean": statistics.fmean(runs)}
+
+
+def _git_commit() -> Optional[str]:
+    """Returns the current git commit hash, or None when not in a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(employees: int, images: int, repeat: int, seed: int, forms: int) -> Dict[str, Any]:
+    """Builds a synthetic roster in a temporary directory and times every scenario.
+    Returns the full result document ready to be dumped as JSON."""
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QApplication
+    import gui_student
+    from employee import Executive, Manager, Permanent, Temporary, Role, Department, Salaried
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results: Dict[str, Any] = {}
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="hr-bench-") as directory:
+        generate_roster(directory, employees, images, seed)
+        # load_file/save_file and the image setter all use paths relative to the cwd
+        os.chdir(directory)
+        try:
+            window = gui_student.MainWindow()
+            window.show()
+            app.processEvents()
+            data = window._data
+
+            # each run starts from an empty roster: _data and every listener-maintained index
+            results["load_file"] = measure(window.load_file, repeat,
+                                           setup=lambda: window.employees_removed(list(data)))
+            # save_file only snapshots and hands off to the autosave thread; the durable
+            # variant also waits for the write to reach the disk
+            results["save_file"] = measure(window.save_file, repeat, setup=window._autosave.flush)
+            results["save_file_durable"] = measure(lambda: (window.save_file(), window._autosave.flush()), repeat)
+
+            def construct() -> None:
+                Executive("Bench Exec", "exec@acme-machining.com", 90000.0, Role.CFO)
+                Manager("Bench Manager", "manager@acme-machining.com", 70000.0, Department.HR)
+                Permanent("Bench Perm", "perm@acme-machining.com", 20.0, datetime.date(2020, 1, 1))
+                Temporary("Bench Temp", "temp@acme-machining.com", 20.0, datetime.date(2030, 1, 1))
+            results["construct_x1000"] = measure(lambda: [construct() for _ in range(250)], repeat)
+
+            results["calc_pay_total"] = measure(lambda: sum(e.calc_pay() for e in data), repeat)
+
+            model = window._model
+            indexes = [model.index(row, column) for row in range(len(data)) for column in range(model.columnCount(None))]
+            results["model_data_all_cells"] = measure(
+                lambda: [model.data(index, Qt.ItemDataRole.DisplayRole) for index in indexes], repeat)
+
+            table = window._table
+            scroll_bar = table.verticalScrollBar()
+
+            def scroll() -> None:
+                step = max(scroll_bar.pageStep(), 1)
+                for value in range(0, scroll_bar.maximum() + 1, step):
+                    scroll_bar.setValue(value)
+                    table.viewport().repaint()
+            results["table_scroll"] = measure(scroll, repeat, setup=lambda: scroll_bar.setValue(0))
+
+            rows = list(range(0, len(data), max(len(data) // max(forms, 1), 1)))[:forms]
+
+            def open_forms() -> None:
+                for row in rows:
+                    table.selectRow(row)
+                    window.edit_employee()
+                    window._employee_form.close()
+                app.processEvents()
+            results["form_open"] = measure(open_forms, repeat)
+
+            def edit() -> None:
+                for employee in data:
+                    if isinstance(employee, Salaried):
+                        employee.yearly = employee.yearly + 1.0
+                    else:
+                        employee.hourly = employee.hourly
+                    employee.name = employee.name
+                    employee.email = employee.email
+                    employee.image = employee.image
+            results["edit_setters"] = measure(edit, repeat)
+            window.close()
+            window._autosave.flush()
+        finally:
+            os.chdir(original_dir)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"employees": employees, "images": images, "repeat": repeat, "seed": seed, "forms": forms},
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str, threshold: float = 0.10) -> bool:
+    """Prints the median time of every scenario in two result files side by side.
+    Returns False if any scenario got slower by more than threshold (a fraction)."""
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    if old["params"] != new["params"]:
+        print(f"warning: parameters differ {old['params']} vs {new['params']}")
+    ok = True
+    print(f"{'scenario':<24}{'old (ms)':>12}{'new (ms)':>12}{'change':>10}")
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            print(f"{name:<24}{'-':>12}{result['median'] * 1000:>12.2f}{'new':>10}")
+            continue
+        before = old["results"][name]["median"]
+        after = result["median"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{name:<24}{before * 1000:>12.2f}{after * 1000:>12.2f}{change:>+10.1%}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the HR Management System")
+    parser.add_argument("--employees", type=int, default=5000, help="number of synthetic employees")
+    parser.add_argument("--images", type=int, default=10, help="number of distinct image files")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per scenario")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the roster generator")
+    parser.add_argument("--forms", type=int, default=20, help="edit forms opened per form_open run")
+    parser.add_argument("--output", default="benchmark.json", help="where to write the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(*args.compare, threshold=args.threshold) else 1)
+    document = run_benchmarks(args.employees, args.images, args.repeat, args.seed, args.forms)
+    with open(args.output, "w") as file:
+        json.dump(document, file, indent=2)
+    for name, result in document["results"].items():
+        print(f"{name:<24}{result['median'] * 1000:>12.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""Undoable edit commands for Employees
+Every change to an Employee field can be expressed as a command (ChangeSalary,
+ChangeDepartment, ChangeRole, ...).  Commands are grouped into batches so one
+operation such as a department-wide raise is validated as a whole, applied as a
+whole and undone as a whole.  The CommandLog only keeps compact
+(employee, field, old, new) tuples per batch, not the command objects, and calls
+its change callback once per batch with every employee the batch touched.
+"""
+
+import abc
+import collections
+import contextlib
+from typing import *
+
+from employee import *
+
+
+class InvalidBatchException(Exception):
+    """
+    Custom exception type raised when one or more commands in a batch are invalid.
+    Holds a list of (command, error) pairs in self.errors
+    """
+    def __init__(self, message: str, errors: List[Tuple["Command", Exception]]):
+        """
+        Excepts message as a str parameter and the list of (command, error) pairs
+        that made the batch invalid
+        """
+        super().__init__(message)
+        self.errors: List[Tuple[Command, Exception]] = errors
+
+
+# One applied change: (employee, field name, old value, new value)
+Change = Tuple[Employee, str, Any, Any]
+
+_FIELDS_CACHE: Dict[type, Tuple[str, ...]] = {}
+
+
+def editable_fields(cls: type) -> Tuple[str, ...]:
+    """Returns the names of every property with a setter on cls (name, email, yearly, role...)."""
+    fields = _FIELDS_CACHE.get(cls)
+    if fields is None:
+        seen = []
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, property) and value.fset is not None and name not in seen:
+                    seen.append(name)
+        fields = _FIELDS_CACHE[cls] = tuple(seen)
+    return fields
+
+
+def snapshot(employee: Employee) -> Dict[str, Any]:
+    """Returns a dict of every editable field of employee and its current value."""
+    return {field: getattr(employee, field) for field in editable_fields(type(employee))}
+
+
+class Command(abc.ABC):
+    """
+    Abstract command that sets one field of one employee to a new value.
+    Subclasses decide which field and which value.
+    """
+    __slots__ = ("employee",)
+
+    def __init__(self, employee: Employee):
+        """Accepts the employee the command acts on."""
+        self.employee: Employee = employee
+
+    @property
+    @abc.abstractmethod
+    def field(self) -> str:
+        """The name of the Employee property this command sets."""
+
+    @abc.abstractmethod
+    def new_value(self) -> Any:
+        """Returns the value the field will be set to."""
+
+    def validate(self) -> None:
+        """Runs the real property setter against a blank object of the same type, so the
+        employee's own rules are checked without changing the employee.
+        Raises the setter's exception (ValueError, InvalidRoleException...) if invalid."""
+        prop = getattr(type(self.employee), self.field, None)
+        if not isinstance(prop, property) or prop.fset is None:
+            raise ValueError(f"{type(self.employee).__name__} has no {self.field}")
+        prop.fset(object.__new__(type(self.employee)), self.new_value())
+
+    def apply(self) -> Change:
+        """Sets the field and returns the applied change."""
+        old = getattr(self.employee, self.field)
+        new = self.new_value()
+        setattr(self.employee, self.field, new)
+        return self.employee, self.field, old, new
+
+    def __repr__(self) -> str:
+        """returns text representation of the command as type str."""
+        return f"{type(self).__name__}({self.employee},{self.field}={self.new_value()!r})"
+
+
+class SetField(Command):
+    """Command setting any named field to a fixed value."""
+    __slots__ = ("_field", "_value")
+
+    def __init__(self, employee: Employee, field: str, value: Any):
+        """Accepts the employee, the property name and the new value."""
+        super().__init__(employee)
+        self._field: str = field
+        self._value: Any = value
+
+    @property
+    def field(self) -> str:
+        return self._field
+
+    def new_value(self) -> Any:
+        return self._value
+
+
+class ChangeName(SetField):
+    """Command changing an employee's name."""
+    __slots__ = ()
+
+    def __init__(self, employee: Employee, name: str):
+        super().__init__(employee, "name", name)
+
+
+class ChangeEmail(SetField):
+    """Command changing an employee's email."""
+    __slots__ = ()
+
+    def __init__(self, employee: Employee, email: str):
+        super().__init__(employee, "email", email)
+
+
+class ChangeImage(SetField):
+    """Command changing an employee's image path."""
+    __slots__ = ()
+
+    def __init__(self, employee: Employee, image: str):
+        super().__init__(employee, "image", image)
+
+
+class ChangeSalary(SetField):
+    """Command changing the pay of an employee: yearly for Salaried, hourly for Hourly."""
+    __slots__ = ()
+
+    def __init__(self, employee: Employee, pay: float):
+        super().__init__(employee, "yearly" if isinstance(employee, Salaried) else "hourly", float(pay))
+
+
+class RaiseSalary(Command):
+    """Command raising (or with a negative percent, cutting) an employee's pay by a percentage."""
+    __slots__ = ("percent",)
+
+    def __init__(self, employee: Employee, percent: float):
+        super().__init__(employee)
+        self.percent: float = percent
+
+    @property
+    def field(self) -> str:
+        return "yearly" if isinstance(self.employee, Salaried) else "hourly"
+
+    def new_value(self) -> float:
+        return round(getattr(self.employee, self.field) * (1 + self.percent / 100), 2)
+
+
+class ChangeDepartment(SetField):
+    """Command moving a Manager to another Department."""
+    __slots__ = ()
+
+    def __init__(self, employee: Employee, department: Department):
+        super().__init__(employee, "department", department)
+
+    def validate(self) -> None:
+        if not isinstance(self.employee, Manager):
+            raise InvalidDepartmentException(f"{self.employee} is not a Manager")
+        super().validate()
+
+
+class ChangeRole(SetField):
+    """Command giving an Executive another Role."""
+    __slots__ = ()
+
+    def __init__(self, employee: Employee, role: Role):
+        super().__init__(employee, "role", role)
+
+    def validate(self) -> None:
+        if not isinstance(self.employee, Executive):
+            raise InvalidRoleException(f"{self.employee} is not an Executive")
+        super().validate()
+
+
+def validate_all(commands: Iterable[Command]) -> List[Tuple[Command, Exception]]:
+    """Validates every command without changing anything.
+    Returns a list of (command, error) pairs, empty when all commands are valid."""
+    errors = []
+    for command in commands:
+        try:
+            command.validate()
+        except (ValueError, TypeError, AttributeError, InvalidRoleException, InvalidDepartmentException) as error:
+            errors.append((command, error))
+    return errors
+
+
+class CommandLog:
+    """
+    Undo/redo history of applied batches.
+    Each batch is stored as a tuple of (employee, field, old, new) changes.
+    """
+    def __init__(self, on_change: Optional[Callable[[Set[Employee]], None]] = None, limit: int = 200,
+                 batch: Optional[Callable[[], ContextManager]] = None):
+        """Accepts an optional callback called once per executed/undone/redone batch with the
+        set of employees it changed, the maximum number of batches kept for undo and an
+        optional context manager factory entered around applying each batch."""
+        self._on_change: Optional[Callable[[Set[Employee]], None]] = on_change
+        self._batch: Callable[[], ContextManager] = batch or contextlib.nullcontext
+        self._undo: Deque[Tuple[str, Tuple[Change, ...]]] = collections.deque(maxlen=limit)
+        self._redo: List[Tuple[str, Tuple[Change, ...]]] = []
+
+    def execute(self, commands: Iterable[Command], description: str = "Edit") -> int:
+        """Validates all commands, then applies them as one undoable batch.
+        Raises InvalidBatchException (and changes nothing) if any command is invalid.
+        Returns the number of fields actually changed."""
+        commands = list(commands)
+        errors = validate_all(commands)
+        if errors:
+            raise InvalidBatchException(f"{len(errors)} of {len(commands)} changes are invalid", errors)
+        applied = []
+        with self._batch():
+            try:
+                for command in commands:
+                    change = command.apply()
+                    if change[2] != change[3]:
+                        applied.append(change)
+            except Exception:
+                # later commands may depend on earlier ones; put everything back before re-raising
+                self._revert(applied)
+                raise
+        self._push(description, applied)
+        return len(applied)
+
+    def record(self, employee: Employee, before: Dict[str, Any], description: str = "Edit employee") -> int:
+        """Records changes that were already made directly through the setters (e.g. by a form)
+        by comparing employee to a snapshot() taken before the edit.
+        Returns the number of fields changed."""
+        changes = [(employee, field, old, getattr(employee, field)) for field, old in before.items()
+                   if getattr(employee, field) != old]
+        self._push(description, changes)
+        return len(changes)
+
+    def _push(self, description: str, changes: List[Change]) -> None:
+        """Stores a finished batch and notifies the callback."""
+        if not changes:
+            return
+        self._undo.append((description, tuple(changes)))
+        self._redo.clear()
+        self._notify(changes)
+
+    def _revert(self, changes: Sequence[Change]) -> None:
+        """Sets every changed field back to its old value, newest change first."""
+        with self._batch():
+            for employee, field, old, _ in reversed(changes):
+                setattr(employee, field, old)
+
+    def _notify(self, changes: Iterable[Change]) -> None:
+        """Calls the change callback once with every employee in changes."""
+        if self._on_change is not None:
+            self._on_change({change[0] for change in changes})
+
+    def undo(self) -> Optional[str]:
+        """Undoes the newest batch. Returns its description, or None if there was nothing to undo."""
+        if not self._undo:
+            return None
+        description, changes = self._undo.pop()
+        self._revert(changes)
+        self._redo.append((description, changes))
+        self._notify(changes)
+        return description
+
+    def redo(self) -> Optional[str]:
+        """Re-applies the newest undone batch. Returns its description, or None if there was nothing to redo."""
+        if not self._redo:
+            return None
+        description, changes = self._redo.pop()
+        with self._batch():
+            for employee, field, _, new in changes:
+                setattr(employee, field, new)
+        self._undo.append((description, changes))
+        self._notify(changes)
+        return description
+
+    def can_undo(self) -> bool:
+        """Returns True if there is a batch to undo."""
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        """Returns True if there is a batch to redo."""
+        return bool(self._redo)
+
+    def clear(self) -> None:
+        """Forgets the whole history, e.g. after the roster is reloaded."""
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,15 @@
+"""Shared pytest fixtures."""
+
+import benchmark
+import pytest
+import roster_import
+
+
+@pytest.fixture
+def roster(tmp_path, monkeypatch):
+    """Employees loaded from a small generated data file.  Runs in the roster's folder,
+    since image paths in the data file are relative."""
+    data_path = benchmark.generate_roster(str(tmp_path), 60, images=3)
+    monkeypatch.chdir(tmp_path)
+    with open(data_path) as file:
+        return [roster_import.build_employee(*roster_import.parse_fields(line.rstrip("\n"))) for line in file]
@@ -2,6 +2,7 @@ import abc
 from enum import Enum
 import datetime
 from os import path
+import perf
 
 class Role(Enum):
     """
@@ -55,6 +56,8 @@ class Employee(abc.ABC):
     """
     CURRENT_ID: int = 1
     IMAGE_PLACEHOLDER: str = "./images/placeholder.png"
+    # functions called as listener(employee, field, old, new) whenever a setter changes a field
+    LISTENERS: list = []
     def __init__(self, name: str, email: str):
         """
         Jack Bellgowan
@@ -67,6 +70,17 @@ class Employee(abc.ABC):
         # adds to CURRENT_ID so next employee has unique ID
         Employee.CURRENT_ID += 1
 
+    def _notify(self, field: str, old, new) -> None:
+        """
+        Calls every function in Employee.LISTENERS with (employee, field, old, new)
+        after a property setter changes a field. Employees still being constructed
+        (the concrete __init__ has not finished) are not reported.
+        returns None
+        """
+        if Employee.LISTENERS and "_constructed" in self.__dict__:
+            for listener in Employee.LISTENERS:
+                listener(self, field, old, new)
+
     @property
     def email(self) -> str:
         """
@@ -89,7 +103,9 @@ class Employee(abc.ABC):
         if not isinstance(email, str) or not email or "@acme-machining.com" not in email:
             raise ValueError("Invalid email")
         # sets email
+        old = getattr(self, "_email", None)
         self._email: str = email
+        self._notify("email", old, email)
 
     @property
     def name(self) -> str:
@@ -112,7 +128,9 @@ class Employee(abc.ABC):
         if not name or not isinstance(name,str):
             raise ValueError("Invalid name")
         # sets name
+        old = getattr(self, "_name", None)
         self._name: str = name
+        self._notify("name", old, name)
 
     @property
     def image(self) -> str:
@@ -132,10 +150,17 @@ class Employee(abc.ABC):
         returns None
         """
         # Checks content of image
-        if not image or not isinstance(image,str) or not path.exists(image):
+        if not image or not isinstance(image,str):
+            raise ValueError("Invalid image")
+        # the existence check is a stat call on every set, so it is timed
+        with perf.span("Employee.image.stat"):
+            exists = path.exists(image)
+        if not exists:
             raise ValueError("Invalid image")
         # sets image
+        old = getattr(self, "_image", None)
         self._image: str = image
+        self._notify("image", old, image)
 
     @property
     def id_number(self) -> int:
@@ -198,7 +223,9 @@ class Salaried(Employee):
         if not isinstance(yearly, float) or yearly <= 50000:
             raise ValueError("Invalid yearly salary")
         # sets yearly
+        old = getattr(self, "_yearly", None)
         self._yearly: float = yearly
+        self._notify("yearly", old, yearly)
 
     def calc_pay(self) -> float:
         """Jack Bellgowan
@@ -246,7 +273,9 @@ class Hourly(Employee):
         if not 15 < hourly < 99.99 or not isinstance(hourly, float):
             raise ValueError("Invalid hourly salary")
         # sets hourly
+        old = getattr(self, "_hourly", None)
         self._hourly: float = hourly
+        self._notify("hourly", old, hourly)
 
     def calc_pay(self) -> float:
         """Jack Bellgowan
@@ -275,6 +304,8 @@ class Executive(Salaried):
         super().__init__(name, email, yearly)
         # sets the employee's Role
         self.role: Role = role
+        # from here on setters notify Employee.LISTENERS
+        self._constructed: bool = True
 
     @property
     def role(self) -> Role:
@@ -295,7 +326,9 @@ class Executive(Salaried):
         if not 1 <= role.value <= 3 or not isinstance(role, Role):
             raise InvalidRoleException("Invalid role")
         # sets role
+        old = getattr(self, "_role", None)
         self._role: Role = role
+        self._notify("role", old, role)
 
     def __repr__(self) -> str:
         """Jack Bellgowan
@@ -318,6 +351,8 @@ class Manager(Salaried):
         super().__init__(name, email, yearly)
         # sets employee department
         self.department: Department = department
+        # from here on setters notify Employee.LISTENERS
+        self._constructed: bool = True
 
     @property
     def department(self) -> Department:
@@ -338,7 +373,9 @@ class Manager(Salaried):
         if not 1 <= department.value <= 5 or not isinstance(department, Department):
             raise InvalidDepartmentException("Invalid department")
         # sets department
+        old = getattr(self, "_department", None)
         self._department: Department = department
+        self._notify("department", old, department)
 
     def __repr__(self) -> str:
         """Jack Bellgowan
@@ -361,6 +398,8 @@ class Permanent(Hourly):
         """
         super().__init__(name, email, hourly)
         self.hired_date: datetime.date = hired_date
+        # from here on setters notify Employee.LISTENERS
+        self._constructed: bool = True
 
     @property
     def hired_date(self) -> datetime.date:
@@ -381,7 +420,9 @@ class Permanent(Hourly):
         if not isinstance(hired_date, datetime.date):
             raise ValueError("Invalid hired date")
         # sets hired date
+        old = getattr(self, "_hired_date", None)
         self._hired_date: datetime.date = hired_date
+        self._notify("hired_date", old, hired_date)
 
     def __repr__(self) -> str:
         """Jack Bellgowan
@@ -403,6 +444,8 @@ class Temporary(Hourly):
         """
         super().__init__(name, email, hourly)
         self.last_day: datetime.date = last_day
+        # from here on setters notify Employee.LISTENERS
+        self._constructed: bool = True
 
     @property
     def last_day(self) -> datetime.date:
@@ -423,7 +466,9 @@ class Temporary(Hourly):
         if not isinstance(last_day, datetime.date):
             raise ValueError("Invalid last day")
         # sets last day
+        old = getattr(self, "_last_day", None)
         self._last_day: datetime.date = last_day
+        self._notify("last_day", old, last_day)
 
     def __repr__(self) -> str:
         """Jack Bellgowan
@@ -6,18 +6,33 @@ Ira Woodring
 Winter 2023
 """
 
+import bisect
+import contextlib
 import csv
+import os
 
 from PyQt6 import QtWidgets
-from PyQt6.QtCore import QAbstractTableModel
+from PyQt6.QtCore import QAbstractTableModel, QAbstractItemModel, QModelIndex, QTimer, QDate, QDateTime, pyqtSignal
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap, QAction
 from PyQt6.QtWidgets import QLabel, QLineEdit, QMenu, QHeaderView, QTableView, QMainWindow, QAbstractItemView, \
-    QPushButton, QVBoxLayout, QListWidget, QListWidgetItem, QComboBox, QApplication, QMessageBox
+    QPushButton, QVBoxLayout, QListWidget, QListWidgetItem, QComboBox, QApplication, QMessageBox, QTableWidget, \
+    QTableWidgetItem, QHBoxLayout, QCheckBox, QFileDialog, QToolBar, QTreeView, QDockWidget, QInputDialog, \
+    QDateEdit, QSpinBox, QDateTimeEdit
 import sys
 from abc import ABC
 
 from employee import *
+from commands import *
+from search import TrigramIndex
+from org import OrgChart, OrgNode, REPORTING_FILE
+from timeline import EmploymentIndex
+from history import HistoryStore
+from aggregates import RosterTotals
+from autosave import AutosaveService, RowCache
+import portraits
+import perf
+import roster_import
 from typing import *
 
 
@@ -29,6 +44,9 @@ class HRTableModel(QAbstractTableModel):
         self._columns = ["ID#", "Type", "Name", "Pay", "Email"]
         self._data = data
 
+    # above this many separate runs of rows, remove_rows moves rows in one layout change
+    MAX_REMOVE_RUNS: int = 64
+
     def headerData(self, section: int, orientation: Qt.Orientation, role: int = ...) -> str:
         """Gives the header info in a format PyQt wants."""
         if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
@@ -40,20 +58,59 @@ class HRTableModel(QAbstractTableModel):
     def data(self, index, role) -> str:
         """Returns the data at some table index."""
         if role == Qt.ItemDataRole.DisplayRole:
-            e = self._data[index.row()]
-            field = e.id_number
-            if index.column() == 1:
-                field = type(e).__name__
-            if index.column() == 2:
-                field = e.name
-            if index.column() == 3:
-                if isinstance(e, Salaried):
-                    field = '${:,.2f}'.format(e.yearly)
-                else:
-                    field = '${:,.2f}'.format(e.hourly)
-            if index.column() == 4:
-                field = e.email
-            return field
+            with perf.span("HRTableModel.data"):
+                e = self._data[index.row()]
+                field = e.id_number
+                if index.column() == 1:
+                    field = type(e).__name__
+                if index.column() == 2:
+                    field = e.name
+                if index.column() == 3:
+                    if isinstance(e, Salaried):
+                        field = '${:,.2f}'.format(e.yearly)
+                    else:
+                        field = '${:,.2f}'.format(e.hourly)
+                if index.column() == 4:
+                    field = e.email
+                return field
+
+    def rows_changed(self, first: int, last: int) -> None:
+        """Tells attached views that rows first..last (inclusive) need repainting."""
+        self.dataChanged.emit(self.index(first, 0), self.index(last, len(self._columns) - 1))
+
+    def append_rows(self, employees: List[Employee]) -> None:
+        """Appends employees to the data as new rows; existing rows, the selection and the
+        scroll position are left alone."""
+        if employees:
+            self.beginInsertRows(QModelIndex(), len(self._data), len(self._data) + len(employees) - 1)
+            self._data.extend(employees)
+            self.endInsertRows()
+
+    def remove_rows(self, rows: List[int]) -> None:
+        """Removes the rows with the given numbers (ascending) from the data, one contiguous run
+        at a time, last run first.  Rows scattered over many runs are removed in one pass
+        instead, moving the selection and other persistent indexes along with their rows."""
+        runs = []
+        for row in rows:
+            if runs and runs[-1][1] == row - 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+        if len(runs) <= self.MAX_REMOVE_RUNS:
+            for first, last in reversed(runs):
+                self.beginRemoveRows(QModelIndex(), first, last)
+                del self._data[first:last + 1]
+                self.endRemoveRows()
+            return
+        self.layoutAboutToBeChanged.emit()
+        gone = set(rows)
+        old = self.persistentIndexList()
+        new = [QModelIndex() if index.row() in gone
+               else self.index(index.row() - bisect.bisect_left(rows, index.row()), index.column())
+               for index in old]
+        self._data[:] = [e for row, e in enumerate(self._data) if row not in gone]
+        self.changePersistentIndexList(old, new)
+        self.layoutChanged.emit()
 
     def rowCount(self, index) -> int:
         """Provides the way for PyQt to get our row count."""
@@ -64,26 +121,203 @@ class HRTableModel(QAbstractTableModel):
         return len(self._columns)
 
 
+class CoalescedCall:
+    """
+    Calls a function once when control returns to the event loop, however many times it
+    was requested before that, so a burst of changes causes one update."""
+    def __init__(self, function: Callable[[], None]) -> None:
+        self._function = function
+        self._pending = False
+
+    def __call__(self) -> None:
+        """Requests the call."""
+        if not self._pending:
+            self._pending = True
+            QTimer.singleShot(0, self._run)
+
+    def _run(self) -> None:
+        self._pending = False
+        self._function()
+
+
+class OrgTreeModel(QAbstractItemModel):
+    """
+    Shows an OrgChart in a QTreeView.  Headcount and payroll come straight from the
+    totals cached on each node; nothing is recomputed when the view repaints.  It is the
+    chart's OrgView, so rows are inserted, removed and moved in place and expanded
+    branches stay expanded."""
+    def __init__(self, org: OrgChart) -> None:
+        super(OrgTreeModel, self).__init__()
+        self._columns = ["Name", "Headcount", "Weekly payroll"]
+        self._org = org
+        self.schedule_refresh = CoalescedCall(self.refresh)
+        org.view = self
+
+    def node(self, index: QModelIndex) -> OrgNode:
+        """Returns the OrgNode behind index (the root for an invalid index)."""
+        return index.internalPointer() if index.isValid() else self._org.root
+
+    def index_of(self, node: OrgNode, column: int = 0) -> QModelIndex:
+        """Returns the index of node (an invalid index for the root)."""
+        if node is self._org.root:
+            return QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    def begin_insert(self, parent: OrgNode, first: int, last: int) -> None:
+        """Announces rows appended to parent."""
+        self.beginInsertRows(self.index_of(parent), first, last)
+
+    def end_insert(self) -> None:
+        """Finishes the announced insertion."""
+        self.endInsertRows()
+
+    def begin_remove(self, parent: OrgNode, first: int, last: int) -> None:
+        """Announces rows removed from parent."""
+        self.beginRemoveRows(self.index_of(parent), first, last)
+
+    def end_remove(self) -> None:
+        """Finishes the announced removal."""
+        self.endRemoveRows()
+
+    def begin_move(self, node: OrgNode, parent: OrgNode, row: int) -> None:
+        """Announces node moving under parent."""
+        self.beginMoveRows(self.index_of(node.parent), node.row, node.row, self.index_of(parent), row)
+
+    def end_move(self) -> None:
+        """Finishes the announced move."""
+        self.endMoveRows()
+
+    def begin_batch(self) -> None:
+        """Announces a batch of structural changes."""
+        self.layoutAboutToBeChanged.emit()
+
+    def end_batch(self) -> None:
+        """Points every persistent index (selection, expanded branches) at its node's new
+        position, or invalidates it if the node was removed."""
+        old = self.persistentIndexList()
+        new = []
+        for index in old:
+            node = index.internalPointer()
+            new.append(self.index_of(node, index.column()) if node.parent is not None else QModelIndex())
+        self.changePersistentIndexList(old, new)
+        self.layoutChanged.emit()
+
+    def totals_changed(self) -> None:
+        """Repaints changed totals on the next event loop pass."""
+        self.schedule_refresh()
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        """Returns the index of a child of parent, as PyQt expects."""
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, self.node(parent).children[row])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        """Returns the index of the parent of index, as PyQt expects."""
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self._org.root:
+            return QModelIndex()
+        return self.index_of(node)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Provides the number of children of parent."""
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Provides the column count, as PyQt expects."""
+        return len(self._columns)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = ...) -> str:
+        """Gives the header info in a format PyQt wants."""
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self._columns[section]
+
+    def data(self, index, role) -> str:
+        """Returns the cached label or totals of a node."""
+        if role == Qt.ItemDataRole.DisplayRole:
+            node = index.internalPointer()
+            if index.column() == 0:
+                return node.label
+            if index.column() == 1:
+                return str(node.headcount)
+            return '${:,.2f}'.format(node.payroll)
+
+    def refresh(self) -> None:
+        """Repaints the nodes whose cached totals changed."""
+        for node in self._org.take_dirty():
+            if node.parent is not None:
+                self.dataChanged.emit(self.index_of(node), self.index_of(node, len(self._columns) - 1))
+
+
 class MainWindow(QMainWindow):
     """MainWindow will have menus and a central list widget."""
+    # how long after the first unsaved edit the roster is saved automatically
+    AUTOSAVE_DELAY_MS: int = 3000
+    # emitted by the autosave worker thread after each write; delivered on the GUI thread
+    save_finished = pyqtSignal()
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
         self.setWindowTitle("Employee Management v1.0.0")
         self.resize(800, 600)
         self._data = []
+        # Employee.LISTENERS entries added by this window, removed again when it closes
+        self._listeners = []
+        # undo/redo history; the model is refreshed once per applied batch
+        self._commands = CommandLog(self.employees_changed, batch=self.editing_batch)
+        # fuzzy name/email search, kept up to date by the Employee setters
+        self._search = TrigramIndex()
+        self._listen(self._search.on_change)
+        self._search_results = []
+        self._search_position = 0
+        # reporting lines with cached headcount/payroll per subtree
+        self._org = OrgChart()
+        self._listen(self._org.on_change)
+        # employment spans from hired_date/last_day for date based headcount queries
+        self._timeline = EmploymentIndex()
+        self._listen(self._timeline.on_change)
+        # append-only change log with checkpoints for "as of" queries
+        self._history = HistoryStore()
+        self._listen(self._history.on_change)
+        # running headcount/payroll totals shown in the status bar
+        self._totals = RosterTotals()
+        self._listen(self._totals.on_change)
+        # saving: cached data file lines per employee, written by a worker thread
+        self._row_cache = RowCache()
+        self._listen(self._row_cache.on_change)
+        self._autosave = AutosaveService(self.save_finished.emit)
+        self.save_finished.connect(self.report_save_errors)
+        self._autosave_timer = QTimer(self)
+        self._autosave_timer.setSingleShot(True)
+        self._autosave_timer.setInterval(self.AUTOSAVE_DELAY_MS)
+        self._autosave_timer.timeout.connect(self.save_file)
+        self._listen(self.schedule_autosave)
+        # id number -> table row, rebuilt whenever the roster size changes
+        self._rows = {}
+        self._model = None
         self.load_file()
         self._model = HRTableModel(self._data)
         self._table = QTableView()
         self._table.setModel(self._model)
         self._table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-        self._table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self._table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self._table.setAlternatingRowColors(True)
         self._header = self._table.horizontalHeader()
         self._header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
         self.setCentralWidget(self._table)
         self._create_menu_bar()
+        self._create_search_bar()
+        self._create_org_tree()
+        self._create_status_bar()
         self._employee_form = None
         self._about_form = AboutForm()
+        self._performance_form = None
+        self._batch_form = None
+        self._workforce_form = None
+        self._history_form = None
 
     def _create_menu_bar(self) -> None:
         # Create the menus.
@@ -91,9 +325,10 @@ class MainWindow(QMainWindow):
         menu_bar.setNativeMenuBar(False)
         file_menu = QMenu("&File", self)
         edit_menu = QMenu("&Edit", self)
+        reports_menu = QMenu("&Reports", self)
         help_menu = QMenu("&Help", self)
         self._exit_action = QAction("&Exit")
-        self._exit_action.triggered.connect(exit)
+        self._exit_action.triggered.connect(self.close)
         self._load_action = QAction("&Load HR Data")
         self._save_action = QAction("&Save HR Data")
         self._save_action.setShortcut('Ctrl+S')
@@ -101,24 +336,251 @@ class MainWindow(QMainWindow):
         self._load_action.setShortcut('Ctrl+O')
         self._load_action.triggered.connect(self.load_file)
         file_menu.addAction(self._save_action)
+        self._portraits_action = QAction("&Move portraits into image store")
+        self._portraits_action.triggered.connect(self.store_portraits)
+        file_menu.addAction(self._portraits_action)
+        self._import_action = QAction("&Import roster changes...")
+        self._import_action.triggered.connect(self.import_roster)
+        file_menu.addAction(self._import_action)
         file_menu.addAction(self._exit_action)
         self._edit_action = QAction("&Edit current employee")
         edit_menu.addAction(self._edit_action)
         self._edit_action.triggered.connect(self.edit_employee)
         self._edit_action.setShortcut('Ctrl+E')
+        self._batch_action = QAction("&Batch edit selected employees")
+        edit_menu.addAction(self._batch_action)
+        self._batch_action.triggered.connect(self.batch_edit)
+        self._batch_action.setShortcut('Ctrl+B')
+        edit_menu.addSeparator()
+        self._undo_action = QAction("&Undo")
+        edit_menu.addAction(self._undo_action)
+        self._undo_action.triggered.connect(self.undo)
+        self._undo_action.setShortcut('Ctrl+Z')
+        self._redo_action = QAction("&Redo")
+        edit_menu.addAction(self._redo_action)
+        self._redo_action.triggered.connect(self.redo)
+        self._redo_action.setShortcut('Ctrl+Shift+Z')
+        edit_menu.addSeparator()
+        self._assign_action = QAction("Report selected to &manager...")
+        edit_menu.addAction(self._assign_action)
+        self._assign_action.triggered.connect(self.assign_manager)
         self._save_action.triggered.connect(self.save_file)
         self._about_action = QAction("About this software")
         self._about_action.triggered.connect(self.show_help)
         help_menu.addAction(self._about_action)
+        self._performance_action = QAction("&Performance")
+        self._performance_action.triggered.connect(self.show_performance)
+        help_menu.addAction(self._performance_action)
         menu_bar.addMenu(file_menu)
+        self._workforce_action = QAction("&Workforce over time")
+        self._workforce_action.triggered.connect(self.show_workforce)
+        reports_menu.addAction(self._workforce_action)
+        self._history_action = QAction("&History")
+        self._history_action.triggered.connect(self.show_history)
+        reports_menu.addAction(self._history_action)
         menu_bar.addMenu(edit_menu)
+        menu_bar.addMenu(reports_menu)
         menu_bar.addMenu(help_menu)
         self.setMenuBar(menu_bar)
 
+    def _create_search_bar(self) -> None:
+        # Type-ahead search box above the table.
+        tool_bar = QToolBar("Search", self)
+        tool_bar.setMovable(False)
+        self._search_edit = QLineEdit()
+        self._search_edit.setPlaceholderText("Search name or email (Enter for next match)")
+        self._search_edit.setClearButtonEnabled(True)
+        self._search_edit.textEdited.connect(self.find_employee)
+        self._search_edit.returnPressed.connect(self.next_match)
+        tool_bar.addWidget(self._search_edit)
+        self.addToolBar(tool_bar)
+        self._find_action = QAction("&Find employee")
+        self._find_action.setShortcut('Ctrl+F')
+        self._find_action.triggered.connect(self._search_edit.setFocus)
+        self.addAction(self._find_action)
+
+    def _create_org_tree(self) -> None:
+        # Org chart dock next to the table.
+        self._org_model = OrgTreeModel(self._org)
+        self._org_tree = QTreeView()
+        self._org_tree.setModel(self._org_model)
+        self._org_tree.setAlternatingRowColors(True)
+        self._org_tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self._org_tree.doubleClicked.connect(self.org_node_clicked)
+        dock = QDockWidget("Org chart", self)
+        dock.setWidget(self._org_tree)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+
+    def schedule_autosave(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback; saves a few seconds after the first unsaved edit,
+        so a burst of edits is written once.  Employees of other windows are ignored."""
+        if old != new and not self._autosave_timer.isActive() and employee in self._totals:
+            self._autosave_timer.start()
+
+    @contextlib.contextmanager
+    def editing_batch(self) -> Iterator[None]:
+        """Context manager around applying a batch of changes, so views that listen to
+        the setters update once for the whole batch."""
+        with self._org.batch(), self._history.batch():
+            yield
+
+    def _listen(self, listener: Callable) -> None:
+        """Adds listener to Employee.LISTENERS until this window closes."""
+        Employee.LISTENERS.append(listener)
+        self._listeners.append(listener)
+
+    def report_save_errors(self) -> None:
+        """Shows the errors of finished background writes and retries them later."""
+        errors = self._autosave.take_errors()
+        if errors:
+            self.statusBar().showMessage("  ".join(errors), 10000)
+            self._autosave_timer.start()
+
+    def closeEvent(self, event) -> None:
+        """Saves pending edits and waits for the save to reach the disk before closing.
+        If the save fails the user may keep the window open instead of losing the edits."""
+        if self._autosave_timer.isActive():
+            self.save_file()
+        self._autosave.flush()
+        errors = self._autosave.take_errors()
+        if errors:
+            answer = QMessageBox.warning(self, "Save failed",
+                                         "\n".join(errors) + "\n\nClose anyway and lose the unsaved changes?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                         QMessageBox.StandardButton.No)
+            if answer != QMessageBox.StandardButton.Yes:
+                self._autosave_timer.start()
+                event.ignore()
+                return
+        # a closed window must not keep reacting to edits made elsewhere
+        for listener in self._listeners:
+            Employee.LISTENERS.remove(listener)
+        self._listeners.clear()
+        self._history.close()
+        super().closeEvent(event)
+
+    def _create_status_bar(self) -> None:
+        # Live roster totals along the bottom of the window.
+        self._status_label = QLabel()
+        self.statusBar().addPermanentWidget(self._status_label, 1)
+        self._totals.on_update = CoalescedCall(self.refresh_status)
+        self.refresh_status()
+
+    def refresh_status(self) -> None:
+        """Shows the current totals in the status bar."""
+        self._status_label.setText(self._totals.summary())
+        self._status_label.setToolTip(self._totals.details())
+
+    def org_node_clicked(self, index: QModelIndex) -> None:
+        """Selects the employee of a double clicked org chart node in the table."""
+        node = self._org_model.node(index)
+        if node.employee is not None:
+            self.select_employee(node.employee)
+
+    def assign_manager(self) -> None:
+        """Asks for a manager and makes every selected hourly employee report to them."""
+        employees = [e for e in self.selected_employees() if isinstance(e, Hourly)]
+        if not employees:
+            return
+        managers = [e for e in self._data if isinstance(e, Manager)]
+        choices = ["(nobody)"] + [str(m) for m in managers]
+        choice, ok = QInputDialog.getItem(self, "Report to manager",
+                                          f"Manager for {len(employees)} hourly employees:", choices, 0, False)
+        if not ok:
+            return
+        manager = managers[choices.index(choice) - 1] if choice != choices[0] else None
+        self._org.assign_all(employees, manager)
+        # reporting lines have no setter to start the autosave timer
+        self._autosave_timer.start()
+
+    def row_of(self, employee: Employee) -> int:
+        """Returns the table row of employee, or -1 if it is not in the roster."""
+        if len(self._rows) != len(self._data):
+            self._rows = {e.id_number: row for row, e in enumerate(self._data)}
+        row = self._rows.get(employee.id_number, -1)
+        if row < 0 or self._data[row] is not employee:
+            return -1
+        return row
+
+    def select_employee(self, employee: Employee) -> None:
+        """Selects the row of employee and scrolls it into view."""
+        row = self.row_of(employee)
+        if row >= 0:
+            self._table.selectRow(row)
+            self._table.scrollTo(self._model.index(row, 0))
+
+    def find_employee(self, text: str) -> None:
+        """Runs a fuzzy search as the user types and jumps to the best match."""
+        self._search_results = [e for e, _ in self._search.search(text, 20)]
+        self._search_position = 0
+        if self._search_results:
+            self.select_employee(self._search_results[0])
+
+    def next_match(self) -> None:
+        """Jumps to the next result of the current search."""
+        if self._search_results:
+            self._search_position = (self._search_position + 1) % len(self._search_results)
+            self.select_employee(self._search_results[self._search_position])
+
+    def employees_added(self, employees: List[Employee], source: Optional[str] = None) -> None:
+        """Appends employees to _data as new table rows and indexes them.  Accepts the data
+        file they were loaded from, if any."""
+        if self._model is not None:
+            self._model.append_rows(employees)
+        else:
+            self._data.extend(employees)
+        self._search.add_all(employees)
+        self._org.add_all(employees)
+        self._timeline.add_all(employees)
+        self._history.add_all(employees, source)
+        self._totals.add_all(employees)
+
+    def employees_removed(self, employees: List[Employee]) -> None:
+        """Takes employees out of _data, the table and every index."""
+        if not employees:
+            return
+        removed = set(employees)
+        rows = [row for row, e in enumerate(self._data) if e in removed]
+        if self._model is not None:
+            self._model.remove_rows(rows)
+        else:
+            self._data[:] = [e for e in self._data if e not in removed]
+        self._rows = {}
+        for e in employees:
+            self._search.remove(e)
+            self._timeline.remove(e)
+            self._history.remove(e)
+            self._totals.remove(e)
+            self._row_cache.pop(e, None)
+        self._org.remove_all(employees)
+
     def show_help(self) -> None:
         """Our 'help' form merely shows who wrote this, the version, and a description."""
         self._about_form.show()
 
+    def show_workforce(self) -> None:
+        """Shows the date based headcount report."""
+        if self._workforce_form is None:
+            self._workforce_form = WorkforceForm(self._timeline)
+        self._workforce_form.refresh()
+        self._workforce_form.show()
+
+    def show_history(self) -> None:
+        """Shows the change history of the selected employee and lets the user export
+        the roster as it was at any moment."""
+        if self._history_form is None:
+            self._history_form = HistoryForm(self._history)
+        selected = self.selected_employees()
+        self._history_form.fill_in(selected[0] if selected else None)
+        self._history_form.show()
+
+    def show_performance(self) -> None:
+        """Shows the panel with the timing spans and counters collected by the perf module."""
+        if self._performance_form is None:
+            self._performance_form = PerformanceForm()
+        self._performance_form.refresh()
+        self._performance_form.show()
+
     def data_to_rows(self) -> List[str]:
         """It is sometimes useful for us to have our model data as a list.  This method
         provides that feature."""
@@ -137,6 +599,97 @@ class MainWindow(QMainWindow):
         """Resize our table to fit our data width."""
         self._header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
 
+    def employees_changed(self, employees: Set[Employee]) -> None:
+        """Called once per applied/undone batch of commands; repaints only the rows
+        spanning the changed employees with a single model update."""
+        rows = [row for row, e in enumerate(self._data) if e in employees]
+        if rows:
+            self._model.rows_changed(rows[0], rows[-1])
+        self.refresh_width()
+
+    def selected_employees(self) -> List[Employee]:
+        """Returns the employees of every selected table row, in table order."""
+        rows = sorted({index.row() for index in self._table.selectionModel().selectedIndexes()})
+        return [self._data[row] for row in rows]
+
+    def batch_edit(self) -> None:
+        """Open the batch edit form for the selected employees."""
+        employees = self.selected_employees()
+        if not employees:
+            return
+        self._batch_form = BatchEditForm(self, employees)
+        self._batch_form.show()
+
+    def store_portraits(self) -> None:
+        """Points every employee at a normalised, deduplicated copy of their portrait,
+        as one undoable batch."""
+        try:
+            commands = portraits.migrate(self._data)
+        except OSError as error:
+            # e.g. the store folder cannot be created; portraits stored so far are reused next time
+            QMessageBox.warning(self, "Store portraits", f"Could not store the portraits:\n{error}")
+            return
+        self._commands.execute(commands, "Move portraits into image store")
+
+    def import_roster(self) -> None:
+        """Compares a roster file from outside (same format as employee.data.csv) with the
+        current roster, shows the differences for review and applies only those."""
+        file_path = QFileDialog.getOpenFileName(self, "Import roster", "", "Roster files (*.csv);;All files (*)")[0]
+        if not file_path:
+            return
+        # id numbers are only line numbers while the roster still matches a fresh load
+        keys = ["email", "id"] if roster_import.ids_follow_lines(self._data) else ["email"]
+        key, ok = QInputDialog.getItem(self, "Import roster", "Match employees by:", keys, 0, False)
+        if not ok:
+            return
+        try:
+            plan = roster_import.plan_import(file_path, self._data, key, self._row_cache.__getitem__)
+        except (OSError, UnicodeDecodeError, ValueError) as error:
+            QMessageBox.warning(self, "Import roster", f"Could not read {os.path.basename(file_path)}:\n{error}")
+            return
+        try:
+            if not plan:
+                QMessageBox.information(self, "Import roster", f"Nothing to change.\n{plan.summary()}")
+                return
+            review = QMessageBox(QMessageBox.Icon.Question, "Import roster",
+                                 f"Changes from {os.path.basename(file_path)}:\n{plan.summary()}",
+                                 QMessageBox.StandardButton.Apply | QMessageBox.StandardButton.Save
+                                 | QMessageBox.StandardButton.Cancel, self)
+            review.setInformativeText("Save writes the full list of changes to a file for review. "
+                                      "An import cannot be undone and clears the undo history.")
+            review.setDetailedText(plan.details())
+            while (answer := review.exec()) == QMessageBox.StandardButton.Save:
+                report = QFileDialog.getSaveFileName(self, "Save import report", "import.changes.csv",
+                                                     "CSV files (*.csv)")[0]
+                if report:
+                    try:
+                        plan.write_report(report)
+                    except OSError as error:
+                        QMessageBox.warning(self, "Import roster", f"Could not save the report:\n{error}")
+            if answer != QMessageBox.StandardButton.Apply:
+                return
+            try:
+                added, removed = roster_import.apply_import(plan, self._data, self._commands,
+                                                            f"Import {os.path.basename(file_path)}")
+            except InvalidBatchException as error:
+                lines = [f"{command.employee}: {problem}" for command, problem in error.errors[:20]]
+                QMessageBox.warning(self, "Import roster", f"{error}\n" + "\n".join(lines))
+                return
+            self.employees_removed(removed)
+            self.employees_added(added)
+            self._autosave_timer.start()
+            self.statusBar().showMessage(f"Imported: {plan.summary()}", 10000)
+        finally:
+            plan.close()
+
+    def undo(self) -> None:
+        """Undo the last batch of changes."""
+        self._commands.undo()
+
+    def redo(self) -> None:
+        """Redo the last undone batch of changes."""
+        self._commands.redo()
+
     def edit_employee(self) -> None:
         """Update an employee object by populating the correct type of form with the selected type of
         employee data."""
@@ -164,26 +717,37 @@ class MainWindow(QMainWindow):
         """Jack Bellgowan
         Read a representation of all of our Employees from a file and store in our
         _data variable.  The table will automatically be populated by this variable."""
-        with open('employee.data.csv') as datafile:
+        loaded = []
+        with perf.span("MainWindow.load_file"), open('employee.data.csv') as datafile:
             reader = csv.reader(datafile, quoting=csv.QUOTE_MINIMAL)
             for row in reader:
                 # will crash if any empty lines are im employee data, appends
                 # a version of the class specified in the save file by converting it from text to a python command
-                exec(f"self._data.append({row[0]}(\"{row[1]}\",\"{row[2]}\","
-                     f"{row[4]},"+row[5].replace("!",",")+"))")
+                with perf.span("MainWindow.load_file.exec"):
+                    exec(f"loaded.append({row[0]}(\"{row[1]}\",\"{row[2]}\","
+                         f"{row[4]},"+row[5].replace("!",",")+"))")
                 # sets the object that was created to have an image from the save file
-                self._data[-1].image = row[3]
+                loaded[-1].image = row[3]
+                # the line just read is what saving would write, so the first save need not format it
+                self._row_cache[loaded[-1]] = ",".join(row)
+                perf.count("MainWindow.load_file.rows")
+        self.employees_added(loaded, 'employee.data.csv')
+        self._org.read_reporting_lines(REPORTING_FILE, self._data)
 
 
     def save_file(self) -> None:
         """Jack Bellgowan
         Save a representation of all the Employees to a file."""
-        # opens the employee save file
-        with open("employee.data.csv", "w") as file:
-            # iterates over each employee
-            for employee in self._data:
-                # adds each employee to the save file
-                file.write(f"{employee.__repr__()}\n")
+        with perf.span("MainWindow.save_file"):
+            self._autosave_timer.stop()
+            # one line per employee, only edited employees are formatted again; the
+            # worker thread does the writing so the window never waits on the disk
+            self._autosave.submit(os.path.abspath("employee.data.csv"), self._row_cache.snapshot(self._data))
+            # reporting lines have no column in the data file, so they live next to it
+            self._autosave.submit(os.path.abspath(REPORTING_FILE), self._org.reporting_lines())
+            # history deltas are buffered; saving is a good moment to push them out too
+            self._history.flush()
+        # write errors are reported by report_save_errors once the worker is done
 
 class EmployeeForm(QtWidgets.QWidget):
     """There will never be a generic employee form, but we don't want to repeat code,
@@ -209,7 +773,8 @@ class EmployeeForm(QtWidgets.QWidget):
         self._image_path_edit = QLineEdit()
         self.layout.addRow(QLabel("Image path:"), self._image_path_edit)
         self._image = QLabel()
-        self._image.setPixmap(QPixmap(self._employee.image))
+        with perf.span("EmployeeForm.pixmap"):
+            self._image.setPixmap(QPixmap(self._employee.image))
         self.layout.addWidget(self._image)
         update = QPushButton("Update")
         update.clicked.connect(self.update_employee)
@@ -232,10 +797,11 @@ class EmployeeForm(QtWidgets.QWidget):
             self._employee.email = self._email_edit.text()
             # changes employee name
             if self._image_path_edit.text():
-                self._employee.image = self._image_path_edit.text()
+                # stores a shrunk, deduplicated copy instead of the original file
+                self._employee.image = portraits.ingest(self._image_path_edit.text())
             else:
                 self._employee.image = self._employee.IMAGE_PLACEHOLDER
-        except ValueError as error:
+        except (ValueError, OSError) as error:
             # opens error window
             self.error_handler(error)
         self._parent.refresh_width()
@@ -245,6 +811,8 @@ class EmployeeForm(QtWidgets.QWidget):
         """Upon opening the form, we wish to add the selected employee's data
         to the fields."""
         self._employee = self._parent._data[index]
+        # remembered so the whole edit can be recorded as one undoable batch
+        self._before = snapshot(self._employee)
         self.setWindowTitle("Edit " + type(self._employee).__name__ + " Employee Information")
         self._id_label.setText(str(self._employee.id_number))
         self._name_edit.setText(self._employee.name)
@@ -254,9 +822,16 @@ class EmployeeForm(QtWidgets.QWidget):
         else:
             self._image_path_edit.setText(self._employee.image)
         # makes the image the same size regardless of resolution, places image
-        self._image.setPixmap(QPixmap(self._employee.image).scaled(300, 300))
+        with perf.span("EmployeeForm.fill_in.pixmap"):
+            self._image.setPixmap(QPixmap(self._employee.image).scaled(300, 300))
         self.show()
 
+    def record_edit(self) -> None:
+        """Records every field changed since fill_in in the parent's undo history."""
+        self._parent._commands.record(self._employee, self._before,
+                                      f"Edit {type(self._employee).__name__} {self._employee}")
+        self._before = snapshot(self._employee)
+
     def error_handler(self, error_message: str) -> None:
         """ Tim Lightner
         Accepts error message as a str, returns None.
@@ -343,6 +918,7 @@ class ExecutiveForm(SalariedForm):
             self._employee.role = Role[self._role_cb.currentText().upper()]
         except ValueError as error:
             self.error_handler(error)
+        self.record_edit()
 
 
 class ManagerForm(SalariedForm):
@@ -376,6 +952,7 @@ class ManagerForm(SalariedForm):
             self._employee.department = Department[self.dept_cb.currentText().upper().replace(" ","_")]
         except ValueError as error:
             self.error_handler(error)
+        self.record_edit()
 
 class HourlyForm(EmployeeForm):
     """Jack Bellgowan
@@ -403,6 +980,7 @@ class HourlyForm(EmployeeForm):
             self._employee.hourly = float(self._pay_edit.text())
         except ValueError as error:
             self.error_handler(error)
+        self.record_edit()
 
 
 class TempForm(HourlyForm):
@@ -442,6 +1020,70 @@ class PermanentForm(HourlyForm):
         self.layout.addRow(QLabel("Hired date: "), QLabel(str(self._employee.hired_date)))
 
 
+class BatchEditForm(QtWidgets.QWidget):
+    """Applies one change (a pay raise, a department or a role) to many employees at once.
+    All changes are validated first and applied as a single undoable batch."""
+    OPERATIONS: List[str] = ["Raise pay by percent", "Set department", "Set role"]
+
+    def __init__(self, parent: MainWindow, employees: List[Employee], *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._parent: MainWindow = parent
+        self._employees: List[Employee] = employees
+        self.setWindowTitle(f"Batch edit {len(employees)} employees")
+        self.layout = QtWidgets.QFormLayout()
+        self._operation_cb = QComboBox()
+        self._operation_cb.addItems(self.OPERATIONS)
+        self.layout.addRow(QLabel("Change:"), self._operation_cb)
+        self._percent_edit = QLineEdit()
+        self.layout.addRow(QLabel("Percent:"), self._percent_edit)
+        self._dept_cb = QComboBox()
+        self._dept_cb.addItems(dept.name.title().replace("_", " ") for dept in Department)
+        self.layout.addRow(QLabel("Department:"), self._dept_cb)
+        self._role_cb = QComboBox()
+        self._role_cb.addItems(role.name.upper() for role in Role)
+        self.layout.addRow(QLabel("Role:"), self._role_cb)
+        apply = QPushButton("Apply")
+        apply.clicked.connect(self.apply)
+        self.layout.addRow(apply)
+        self.setLayout(self.layout)
+        self.setWindowModality(Qt.WindowModality.ApplicationModal)
+        self._msg: QMessageBox = QMessageBox()
+        self._msg.setIcon(QMessageBox.Icon.Warning)
+
+    def build_commands(self) -> List[Command]:
+        """Returns one command per selected employee for the chosen operation."""
+        operation = self._operation_cb.currentIndex()
+        if operation == 0:
+            percent = float(self._percent_edit.text())
+            return [RaiseSalary(e, percent) for e in self._employees]
+        if operation == 1:
+            department = Department[self._dept_cb.currentText().upper().replace(" ", "_")]
+            return [ChangeDepartment(e, department) for e in self._employees]
+        role = Role[self._role_cb.currentText().upper()]
+        return [ChangeRole(e, role) for e in self._employees]
+
+    def apply(self) -> None:
+        """Validates and applies the batch, showing every invalid change if it is rejected."""
+        try:
+            commands = self.build_commands()
+            self._parent._commands.execute(commands, self._operation_cb.currentText())
+        except InvalidBatchException as error:
+            lines = [f"{command.employee}: {problem}" for command, problem in error.errors[:20]]
+            self.error_handler(f"{error}\n" + "\n".join(lines))
+            return
+        except ValueError as error:
+            self.error_handler(error)
+            return
+        self.setVisible(False)
+
+    def error_handler(self, error_message: str) -> None:
+        """Shows an error pop up with the given message."""
+        self._msg.setText(str(error_message))
+        self._msg.setWindowTitle("Error")
+        self._msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+        self._msg.exec()
+
+
 class AboutForm(QtWidgets.QWidget):
     """An About Form just gives information about our app to users who want to see it.  Automatically
     sets itself visible on creation."""
@@ -464,9 +1106,171 @@ class AboutForm(QtWidgets.QWidget):
 
 
 
+class WorkforceForm(QtWidgets.QWidget):
+    """Date based headcount report: who is employed on a date, which temps end soon,
+    and headcount over a range of dates, all answered from the EmploymentIndex."""
+    # the employed-on list shows at most this many names, the label gives the full count
+    MAX_LISTED: int = 500
+
+    def __init__(self, timeline: EmploymentIndex, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._timeline: EmploymentIndex = timeline
+        self.setWindowTitle("Workforce over time")
+        self.resize(500, 600)
+        self.layout = QtWidgets.QFormLayout()
+        today = QDate.currentDate()
+        self._day_edit = QDateEdit(today)
+        self._day_edit.setCalendarPopup(True)
+        self.layout.addRow(QLabel("As of:"), self._day_edit)
+        self._days_spin = QSpinBox()
+        self._days_spin.setRange(1, 3650)
+        self._days_spin.setValue(30)
+        self.layout.addRow(QLabel("Temps ending within (days):"), self._days_spin)
+        self._from_edit = QDateEdit(today.addYears(-5))
+        self._from_edit.setCalendarPopup(True)
+        self.layout.addRow(QLabel("Series from:"), self._from_edit)
+        self._to_edit = QDateEdit(today)
+        self._to_edit.setCalendarPopup(True)
+        self.layout.addRow(QLabel("Series to:"), self._to_edit)
+        self._headcount_label = QLabel()
+        self.layout.addRow(QLabel("Employed on date:"), self._headcount_label)
+        self._employed_list = QListWidget()
+        self.layout.addRow(self._employed_list)
+        self._ending_list = QListWidget()
+        self.layout.addRow(QLabel("Temps ending:"), self._ending_list)
+        self._series_table = QTableWidget(0, 2)
+        self._series_table.setHorizontalHeaderLabels(["Date", "Headcount"])
+        self._series_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.layout.addRow(self._series_table)
+        for edit in (self._day_edit, self._from_edit, self._to_edit):
+            edit.dateChanged.connect(self.refresh)
+        self._days_spin.valueChanged.connect(self.refresh)
+        self.setLayout(self.layout)
+
+    def refresh(self) -> None:
+        """Re-runs every query for the chosen dates."""
+        day = self._day_edit.date().toPyDate()
+        self._headcount_label.setText(str(self._timeline.headcount_on(day)))
+        self._employed_list.clear()
+        self._employed_list.addItems(map(str, self._timeline.employed_on(day, self.MAX_LISTED)))
+        ending = self._timeline.ending_between(day, day + datetime.timedelta(days=self._days_spin.value()))
+        self._ending_list.clear()
+        self._ending_list.addItems(f"{e.last_day}  {e}" for e in ending)
+        series = self._timeline.headcount_series(self._from_edit.date().toPyDate(), self._to_edit.date().toPyDate())
+        self._series_table.setRowCount(len(series))
+        for row, (when, headcount) in enumerate(series):
+            self._series_table.setItem(row, 0, QTableWidgetItem(when.isoformat()))
+            self._series_table.setItem(row, 1, QTableWidgetItem(str(headcount)))
+
+
+class HistoryForm(QtWidgets.QWidget):
+    """Lists the recorded changes of one employee and exports the whole roster
+    as it was at a chosen date and time."""
+    def __init__(self, history: HistoryStore, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._history: HistoryStore = history
+        self.setWindowTitle("History")
+        self.resize(500, 450)
+        self.layout = QtWidgets.QFormLayout()
+        self._employee_label = QLabel()
+        self.layout.addRow(QLabel("Employee:"), self._employee_label)
+        self._changes_list = QListWidget()
+        self.layout.addRow(self._changes_list)
+        self._when_edit = QDateTimeEdit(QDateTime.currentDateTime())
+        self._when_edit.setCalendarPopup(True)
+        self.layout.addRow(QLabel("Roster as of:"), self._when_edit)
+        export = QPushButton("Export roster as of...")
+        export.clicked.connect(self.export_roster)
+        self.layout.addRow(export)
+        self.setLayout(self.layout)
+
+    def fill_in(self, employee: Optional[Employee]) -> None:
+        """Shows the recorded changes of employee (nothing if None)."""
+        self._changes_list.clear()
+        if employee is None:
+            self._employee_label.setText("(select an employee in the table)")
+            return
+        self._employee_label.setText(str(employee))
+        self._changes_list.addItems(f"{when:%Y-%m-%d %H:%M:%S}  {field} -> {value}"
+                                    for when, field, value in self._history.employee_history(employee.email))
+
+    def export_roster(self) -> None:
+        """Asks for a file name and writes the roster as of the chosen moment to it."""
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export roster", "employee.asof.csv", "CSV (*.csv)")
+        if not file_path:
+            return
+        try:
+            self._history.write_roster(self._when_edit.dateTime().toPyDateTime(), file_path)
+        except OSError as error:
+            QMessageBox.warning(self, "Export roster", f"Could not export the roster:\n{error}")
+
+
+class PerformanceForm(QtWidgets.QWidget):
+    """Shows the timing spans and counters collected by the perf module, and lets the
+    user turn profiling on/off, clear the data or save it as a Chrome trace file."""
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.setWindowTitle("Performance")
+        self.resize(600, 400)
+        self.layout = QVBoxLayout()
+        self._enabled_cb = QCheckBox("Profiling enabled")
+        self._enabled_cb.toggled.connect(self.toggle_profiling)
+        self.layout.addWidget(self._enabled_cb)
+        self._table = QTableWidget(0, 5)
+        self._table.setHorizontalHeaderLabels(["Span / counter", "Count", "Total ms", "Mean ms", "Max ms"])
+        self._table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self._table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.layout.addWidget(self._table)
+        buttons = QHBoxLayout()
+        for text, slot in (("Refresh", self.refresh), ("Reset", self.reset), ("Save trace...", self.save_trace),
+                           ("Close", self.close_form)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        self.layout.addLayout(buttons)
+        self.setLayout(self.layout)
+
+    def refresh(self) -> None:
+        """Reloads the table from the perf module."""
+        self._enabled_cb.setChecked(perf.ENABLED)
+        rows = [[row["name"], str(row["count"]), f"{row['total_ms']:.3f}", f"{row['mean_ms']:.4f}",
+                 f"{row['max_ms']:.3f}"] for row in perf.stats()]
+        rows.extend([name, str(value), "", "", ""] for name, value in sorted(perf.counters().items()))
+        self._table.setRowCount(len(rows))
+        for row_number, row in enumerate(rows):
+            for column, text in enumerate(row):
+                self._table.setItem(row_number, column, QTableWidgetItem(text))
+
+    def toggle_profiling(self, checked: bool) -> None:
+        """Turns profiling on or off from the checkbox."""
+        if checked:
+            perf.enable()
+        else:
+            perf.disable()
+
+    def reset(self) -> None:
+        """Clears all collected data."""
+        perf.reset()
+        self.refresh()
+
+    def save_trace(self) -> None:
+        """Asks for a file name and dumps the collected data as a Chrome trace."""
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save trace", "trace.json", "JSON (*.json)")
+        if not file_path:
+            return
+        try:
+            perf.dump(file_path)
+        except OSError as error:
+            QMessageBox.warning(self, "Save trace", f"Could not save the trace:\n{error}")
+
+    def close_form(self) -> None:
+        """
+        Hide the form."""
+        self.setVisible(False)
+
 
 def main():
-    app = QApplication(sys.argv)
+    app = QApplication(perf.configure(sys.argv))
     mf = MainWindow()
     mf.show()
     sys.exit(app.exec())
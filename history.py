@@ -0,0 +1,376 @@
+"""Employee change history
+Every field change made through the Employee setters is appended to a history
+file as a one-line delta.  After as many deltas as there are employees (at
+least CHECKPOINT_EVERY) a full checkpoint of the roster is written, so
+checkpoints cost O(1) per delta however large the roster.  A checkpoint falling
+due inside a batch() waits for the batch to end.  Loading a roster also writes a
+checkpoint, unless the data file is the one loaded at the last checkpoint and
+nothing was recorded since, so sessions without edits add nothing.  The roster
+"as of" any moment is rebuilt by seeking to the last checkpoint before it and
+replaying the deltas that follow, so old versions never need their own copy of
+the data file.
+
+Checkpoint offsets are kept in a small index file next to the history file
+(HISTORY_FILE with ".index" added before the extension), so opening the history
+does not read it.  A missing or stale index is rebuilt by scanning the history once.
+
+The file is CSV; the first column is the record type:
+    C,<time>,<count>                         checkpoint header, followed by <count> E rows
+    E,<email>,<type>,<field>,<value>,...     one employee in a checkpoint
+    D,<time>,<email>,<field>,<value>         a field changed
+    A,<time>,<email>,<type>,<field>,<value>,...  an employee was added
+    R,<time>,<email>                         an employee was removed
+The index file holds one <time>,<offset>,<end>,<fingerprint> row per checkpoint:
+where the checkpoint starts and ends in the history file and the SHA-1 of the
+data file it was loaded from (empty for periodic checkpoints).
+Employees are identified by email, not by id number: id numbers are handed out
+again by every session, emails stay with the person.  A change of email is a D
+row keyed by the old email, so employee_history() follows a person back through
+every email they had, across sessions.
+"""
+
+import bisect
+import contextlib
+import csv
+import datetime
+import hashlib
+import io
+import os
+import time
+from typing import *
+
+from commands import snapshot
+from employee import *
+
+HISTORY_FILE: str = "employee.history.csv"
+CHECKPOINT_EVERY: int = 5000
+_CHUNK: int = 1 << 20
+
+FIELD_TYPES: Dict[str, type] = {
+    "name": str, "email": str, "image": str, "yearly": float, "hourly": float,
+    "role": Role, "department": Department, "hired_date": datetime.date, "last_day": datetime.date,
+}
+EMPLOYEE_TYPES: Dict[str, type] = {cls.__name__: cls for cls in (Executive, Manager, Permanent, Temporary)}
+
+
+def encode(value: Any) -> str:
+    """Returns a field value as text for the history file."""
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def decode(field: str, text: str) -> Any:
+    """Returns the value of field stored as text by encode()."""
+    kind = FIELD_TYPES[field]
+    if kind is Role or kind is Department:
+        return kind[text]
+    if kind is datetime.date:
+        return datetime.date.fromisoformat(text)
+    return kind(text)
+
+
+def file_fingerprint(file_path: str) -> str:
+    """Returns the hex SHA-1 of the file at file_path, read in chunks."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def to_row(record: Dict[str, Any]) -> str:
+    """Returns a reconstructed employee record as a line in the employee.data.csv format,
+    so an "as of" roster can be loaded like any other data file."""
+    pay = record.get("yearly", record.get("hourly"))
+    line = f"{record['type']},{record['name']},{record['email']},{record['image']},{pay},"
+    if "role" in record:
+        return line + f"{record['role']}"
+    if "department" in record:
+        return line + f"{record['department']}"
+    return line + repr(record.get("hired_date", record.get("last_day"))).replace(",", "!")
+
+
+class HistoryStore:
+    """
+    Append-only history of a roster with periodic checkpoints.
+    Register on_change in Employee.LISTENERS to record edits.
+    """
+    def __init__(self, file_path: str = HISTORY_FILE, checkpoint_every: int = CHECKPOINT_EVERY):
+        """Accepts the history file (created on first write) and the fewest deltas written
+        between checkpoints.  Reads the checkpoint index of an existing file."""
+        self._file_path: str = file_path
+        root, extension = os.path.splitext(file_path)
+        self._index_path: str = f"{root}.index{extension}"
+        self._checkpoint_every: int = checkpoint_every
+        # email -> employee; with duplicate emails only the last employee is tracked
+        self._tracked: Dict[str, Employee] = {}
+        # (time, byte offset) of every checkpoint, in file order
+        self._checkpoints: List[Tuple[float, int]] = []
+        # (end offset, data file fingerprint) of the newest checkpoint
+        self._last: Tuple[int, str] = (-1, "")
+        self._since_checkpoint: int = 0
+        self._batch_depth: int = 0
+        self._file = None
+        self._index()
+
+    def _index(self) -> None:
+        """Reads the checkpoint index, or rebuilds it if it is missing or does not fit the
+        history file (e.g. the history was replaced or truncated)."""
+        if not os.path.exists(self._file_path):
+            if os.path.exists(self._index_path):
+                os.remove(self._index_path)
+            return
+        indexed = os.path.exists(self._index_path)
+        rows = []
+        if indexed:
+            with open(self._index_path, newline="") as file:
+                rows = [(float(row[0]), int(row[1]), int(row[2]), row[3]) for row in csv.reader(file)]
+        if not indexed or rows and not self._fits(rows[-1]):
+            rows = self._scan()
+            with open(self._index_path, "w", newline="") as file:
+                csv.writer(file).writerows((repr(when), offset, end, "") for when, offset, end, _ in rows)
+        self._checkpoints = [(when, offset) for when, offset, _, _ in rows]
+        if rows:
+            self._last = (rows[-1][2], rows[-1][3])
+
+    def _fits(self, row: Tuple[float, int, int, str]) -> bool:
+        """Returns True if the index row points at a checkpoint inside the history file."""
+        _, offset, end, _ = row
+        if end > os.path.getsize(self._file_path):
+            return False
+        with open(self._file_path, "rb") as file:
+            file.seek(offset)
+            return file.read(2) == b"C,"
+
+    def _scan(self) -> List[Tuple[float, int, int, str]]:
+        """Reads the whole history file; returns an index row for every checkpoint."""
+        rows = []
+        with open(self._file_path, "rb") as file:
+            offset = 0
+            remaining = 0
+            for raw in file:
+                kind = raw[:1]
+                if kind == b"C":
+                    row = next(csv.reader([raw.decode()]))
+                    rows.append([float(row[1]), offset, offset, ""])
+                    remaining = int(row[2])
+                    self._since_checkpoint = 0
+                elif kind == b"D":
+                    self._since_checkpoint += 1
+                offset += len(raw)
+                if kind == b"C" or kind == b"E" and remaining:
+                    remaining -= kind == b"E"
+                    rows[-1][2] = offset
+        return [tuple(row) for row in rows]
+
+    def _end(self) -> int:
+        """Returns the size of the history file including buffered records."""
+        if self._file is not None:
+            self._file.flush()
+            return self._file.tell()
+        return os.path.getsize(self._file_path) if os.path.exists(self._file_path) else 0
+
+    def _writer(self) -> Any:
+        """Returns a csv writer appending to the history file, opening it on first use."""
+        if self._file is None:
+            self._file = open(self._file_path, "a", newline="")
+        return csv.writer(self._file)
+
+    @staticmethod
+    def _employee_fields(employee: Employee) -> List[str]:
+        """Returns the type name followed by field, value pairs for every field of employee."""
+        row = [type(employee).__name__]
+        for field, value in snapshot(employee).items():
+            row.extend((field, encode(value)))
+        return row
+
+    def checkpoint(self, fingerprint: str = "") -> None:
+        """Writes the full current state of every tracked employee and indexes it.
+        Accepts the fingerprint of the data file the roster was just loaded from, if any."""
+        writer = self._writer()
+        self._file.flush()
+        now = time.time()
+        offset = self._file.tell()
+        writer.writerow(["C", repr(now), len(self._tracked)])
+        writer.writerows(["E", email] + self._employee_fields(employee)
+                         for email, employee in self._tracked.items())
+        self._file.flush()
+        self._checkpoints.append((now, offset))
+        self._last = (self._file.tell(), fingerprint)
+        # indexed only once the checkpoint is complete; a crash in between just leaves it unindexed
+        with open(self._index_path, "a", newline="") as file:
+            csv.writer(file).writerow([repr(now), offset, self._last[0], fingerprint])
+        self._since_checkpoint = 0
+
+    def _checkpoint_due(self) -> bool:
+        """Returns True once as many deltas as there are employees (at least the configured
+        minimum) were written since the last checkpoint."""
+        return self._since_checkpoint >= max(self._checkpoint_every, len(self._tracked))
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Context manager for a batch of edits: a checkpoint falling due inside waits until
+        the batch ends, and the file is flushed once at the end."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                if self._checkpoint_due():
+                    self.checkpoint()
+                self.flush()
+
+    def flush(self) -> None:
+        """Pushes buffered records to the history file."""
+        if self._file is not None:
+            self._file.flush()
+
+    def add_all(self, employees: Iterable[Employee], source: Optional[str] = None) -> None:
+        """Starts tracking employees.  A few are logged as additions; a large batch (such as
+        loading the data file) is followed by a checkpoint instead.  Accepts the data file
+        the employees were loaded from: when it is the file of the newest checkpoint and
+        nothing was recorded after it, that checkpoint already holds them."""
+        employees = [e for e in employees if self._tracked.get(e.email) is not e]
+        if not employees:
+            return
+        large = len(employees) * 8 > len(self._tracked)
+        for employee in employees:
+            self._tracked[employee.email] = employee
+        if large:
+            fingerprint = file_fingerprint(source) if source is not None else ""
+            whole = len(employees) == len(self._tracked)
+            if not (whole and fingerprint and self._last == (self._end(), fingerprint)):
+                self.checkpoint(fingerprint)
+            return
+        writer = self._writer()
+        now = repr(time.time())
+        writer.writerows(["A", now, e.email] + self._employee_fields(e) for e in employees)
+
+    def add(self, employee: Employee) -> None:
+        """Starts tracking one employee."""
+        self.add_all([employee])
+
+    def remove(self, employee: Employee) -> None:
+        """Stops tracking employee and logs its removal."""
+        if self._tracked.get(employee.email) is employee:
+            del self._tracked[employee.email]
+            self._writer().writerow(["R", repr(time.time()), employee.email])
+
+    def on_change(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback appending one delta per changed field.
+        A new email is recorded under the old one, and the employee is tracked by the new one."""
+        key = old if field == "email" else employee.email
+        if old == new or self._tracked.get(key) is not employee:
+            return
+        if field == "email":
+            del self._tracked[old]
+            self._tracked[new] = employee
+        self._writer().writerow(["D", repr(time.time()), key, field, encode(new)])
+        self._since_checkpoint += 1
+        if not self._batch_depth and self._checkpoint_due():
+            self.checkpoint()
+
+    def _aliases(self, email: str) -> List[Tuple[str, int]]:
+        """Returns (email, first line number) for every email the employee now at email had,
+        newest first: from that line of the history file on, D rows of the employee are
+        keyed by that email.  Reads the file once, parsing only email changes."""
+        changes = []
+        with open(self._file_path, "rb") as file:
+            for number, raw in enumerate(file):
+                if raw[:1] == b"D" and b",email," in raw:
+                    row = next(csv.reader([raw.decode()]))
+                    if row[3] == "email":
+                        changes.append((number, row[2], row[4]))
+        aliases = []
+        for number, old, new in reversed(changes):
+            if new == email:
+                # the row changing the email is itself keyed by the old email
+                aliases.append((email, number + 1))
+                email = old
+        aliases.append((email, 0))
+        return aliases
+
+    def employee_history(self, email: str) -> List[Tuple[datetime.datetime, str, Any]]:
+        """Returns (when, field, new value) for every recorded change of the employee whose
+        email is now email, from every session, oldest first.  Reads the history file; only
+        rows mentioning one of the employee's emails are parsed."""
+        self.flush()
+        if not os.path.exists(self._file_path):
+            return []
+        aliases = self._aliases(email)
+        needles = {alias.encode() for alias, _ in aliases}
+        changes = []
+        with open(self._file_path, "rb") as file:
+            for number, raw in enumerate(file):
+                if raw[:1] != b"D" or not any(needle in raw for needle in needles):
+                    continue
+                row = next(csv.reader([raw.decode()]))
+                # the email this employee had at this line of the file
+                key = next(alias for alias, first in aliases if number >= first)
+                if row[2] == key:
+                    changes.append((datetime.datetime.fromtimestamp(float(row[1])), row[3],
+                                    decode(row[3], row[4])))
+        return changes
+
+    def as_of(self, when: datetime.datetime) -> Dict[str, Dict[str, Any]]:
+        """Returns the roster as it was at when: email -> {"type": ..., field: value, ...},
+        in roster order.
+        Only the last checkpoint before when and the deltas after it are read.
+        Returns an empty dict if nothing was recorded before when."""
+        moment = when.timestamp()
+        position = bisect.bisect_right(self._checkpoints, (moment, float("inf"))) - 1
+        if position < 0:
+            return {}
+        self.flush()
+        roster: Dict[str, Dict[str, Any]] = {}
+        with open(self._file_path, newline="") as file:
+            file.seek(self._checkpoints[position][1])
+            for row in csv.reader(file):
+                kind = row[0]
+                if kind == "E":
+                    roster[row[1]] = self._record(row[2:])
+                    continue
+                if float(row[1]) > moment:
+                    break
+                if kind == "C":
+                    roster = {}
+                elif kind == "D":
+                    record = roster.get(row[2])
+                    if record is not None:
+                        record[row[3]] = decode(row[3], row[4])
+                        if row[3] == "email":
+                            roster[row[4]] = roster.pop(row[2])
+                elif kind == "A":
+                    roster[row[2]] = self._record(row[3:])
+                elif kind == "R":
+                    roster.pop(row[2], None)
+        return roster
+
+    @staticmethod
+    def _record(row: List[str]) -> Dict[str, Any]:
+        """Turns "type, field, value, field, value..." columns into a record dict."""
+        record: Dict[str, Any] = {"type": row[0]}
+        for number in range(1, len(row) - 1, 2):
+            record[row[number]] = decode(row[number], row[number + 1])
+        return record
+
+    def write_roster(self, when: datetime.datetime, file_path: str) -> int:
+        """Writes the roster as of when to file_path in the employee.data.csv format.
+        Returns the number of employees written."""
+        roster = self.as_of(when)
+        buffer = io.StringIO()
+        for record in roster.values():
+            buffer.write(f"{to_row(record)}\n")
+        with open(file_path, "w") as file:
+            file.write(buffer.getvalue())
+        return len(roster)
+
+    def close(self) -> None:
+        """Closes the history file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
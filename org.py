@@ -0,0 +1,339 @@
+"""Org chart with cached subtree totals
+The roster has no reporting lines, so the tree is built from what it does have:
+
+    Company
+      Role (CEO office, CFO office, CIO office)
+        Executives holding that role
+        Departments owned by that role (see DEPARTMENT_OWNERS)
+          Managers of that department
+            Hourly employees reporting to that manager
+      Unassigned hourly employees
+
+Every node caches the headcount and weekly payroll (sum of calc_pay) of its
+subtree.  A pay change adds the difference to each ancestor and a role,
+department or reporting-line change moves one node with its cached totals, so
+every update costs O(depth) (plus renumbering the siblings after a moved node)
+instead of a rescan.  Structural changes are reported to an OrgView one row at
+a time, or once for a whole batch().  Hourly -> manager links are kept in a
+separate CSV file because employee.data.csv has no column for them.
+"""
+
+import contextlib
+import csv
+import io
+import os
+from typing import *
+
+from employee import *
+
+# Which executive office each department reports to
+DEPARTMENT_OWNERS: Dict[Department, Role] = {
+    Department.ACCOUNTING: Role.CFO,
+    Department.FINANCE: Role.CFO,
+    Department.HR: Role.CEO,
+    Department.R_AND_D: Role.CIO,
+    Department.MACHINING: Role.CEO,
+}
+REPORTING_FILE: str = "employee.org.csv"
+
+
+class OrgNode:
+    """
+    One node of the org chart: a group (company, role office, department) or an employee.
+    headcount and payroll always cover the whole subtree.
+    """
+    __slots__ = ("label", "employee", "parent", "children", "row", "headcount", "payroll", "own_pay")
+
+    def __init__(self, label: str, employee: Optional[Employee] = None):
+        """Accepts the text shown for the node and the employee it stands for (None for groups)."""
+        self.label: str = label
+        self.employee: Optional[Employee] = employee
+        self.parent: Optional[OrgNode] = None
+        self.children: List[OrgNode] = []
+        # position in parent.children, kept so removal and lookup are O(1)
+        self.row: int = 0
+        self.own_pay: float = employee.calc_pay() if employee is not None else 0.0
+        self.headcount: int = 1 if employee is not None else 0
+        self.payroll: float = self.own_pay
+
+    def __repr__(self) -> str:
+        """returns text representation of the node as type str."""
+        return f"{self.label}: {self.headcount} people, ${self.payroll:,.2f}/week"
+
+
+class OrgView:
+    """
+    Receives the structural changes of an OrgChart in the order a Qt item model announces
+    them.  Every method does nothing; a view overrides the ones it needs.
+    """
+    def begin_insert(self, parent: OrgNode, first: int, last: int) -> None:
+        """Rows first..last are about to be appended to parent."""
+
+    def end_insert(self) -> None:
+        """The announced rows were inserted."""
+
+    def begin_remove(self, parent: OrgNode, first: int, last: int) -> None:
+        """Rows first..last of parent are about to be removed."""
+
+    def end_remove(self) -> None:
+        """The announced rows were removed."""
+
+    def begin_move(self, node: OrgNode, parent: OrgNode, row: int) -> None:
+        """node is about to move to position row of parent."""
+
+    def end_move(self) -> None:
+        """The announced move is done."""
+
+    def begin_batch(self) -> None:
+        """Any number of rows are about to be inserted, removed or moved at once."""
+
+    def end_batch(self) -> None:
+        """The batch is done; node.row and node.parent hold the new layout."""
+
+    def totals_changed(self) -> None:
+        """Cached totals or labels changed; see OrgChart.take_dirty()."""
+
+
+class OrgChart:
+    """
+    Reporting-line tree over a roster.  Register on_change in Employee.LISTENERS to keep
+    the cached totals current while employees are edited.
+    """
+    def __init__(self, employees: Iterable[Employee] = ()):
+        """Accepts the employees to place in the chart."""
+        self.root: OrgNode = OrgNode("Company")
+        self._nodes: Dict[Employee, OrgNode] = {}
+        self._dirty: Set[OrgNode] = set()
+        # told about every change of the tree shape and totals
+        self.view: OrgView = OrgView()
+        # open batch() blocks, whether the view was told a batch started, and the nodes
+        # removed during it (kept alive until the view has seen the new layout)
+        self._batch_depth: int = 0
+        self._batch_started: bool = False
+        self._batch_removed: List[OrgNode] = []
+        # parents with None holes left by nodes detached during the open batch
+        self._holes: Set[OrgNode] = set()
+        self._roles: Dict[Role, OrgNode] = {}
+        self._departments: Dict[Department, OrgNode] = {}
+        for role in Role:
+            self._roles[role] = self._attach(OrgNode(f"{role.name} office"), self.root)
+        for department, role in DEPARTMENT_OWNERS.items():
+            self._departments[department] = self._attach(
+                OrgNode(department.name.title().replace("_", " ")), self._roles[role])
+        self.unassigned: OrgNode = self._attach(OrgNode("Unassigned hourly"), self.root)
+        self.add_all(employees)
+
+    def __contains__(self, employee: Employee) -> bool:
+        """Returns True if employee is in the chart."""
+        return employee in self._nodes
+
+    def node(self, employee: Employee) -> OrgNode:
+        """Returns the node of employee. Raises KeyError if it is not in the chart."""
+        return self._nodes[employee]
+
+    def _attach(self, node: OrgNode, parent: OrgNode) -> OrgNode:
+        """Makes node the last child of parent and adds its totals to every ancestor."""
+        node.parent = parent
+        node.row = len(parent.children)
+        parent.children.append(node)
+        self._propagate(parent, node.headcount, node.payroll)
+        return node
+
+    def _detach(self, node: OrgNode) -> None:
+        """Removes node from its parent, renumbers the later siblings and subtracts its
+        totals from every ancestor.  Inside a batch the node leaves a None hole instead,
+        and every parent is compacted once when the batch ends."""
+        parent = node.parent
+        if self._batch_depth:
+            parent.children[node.row] = None
+            self._holes.add(parent)
+        else:
+            del parent.children[node.row]
+            self._renumber(parent, node.row)
+        node.parent = None
+        self._propagate(parent, -node.headcount, -node.payroll)
+
+    @staticmethod
+    def _renumber(parent: OrgNode, first: int) -> None:
+        """Stores the position of every child of parent from first on."""
+        children = parent.children
+        for row in range(first, len(children)):
+            children[row].row = row
+
+    def _propagate(self, node: Optional[OrgNode], headcount: int, payroll: float) -> None:
+        """Adds headcount and payroll to node and all of its ancestors."""
+        while node is not None:
+            node.headcount += headcount
+            node.payroll += payroll
+            self._dirty.add(node)
+            node = node.parent
+
+    def _home(self, employee: Employee) -> OrgNode:
+        """Returns the group node an employee belongs under when it has no manager."""
+        if isinstance(employee, Executive):
+            return self._roles[employee.role]
+        if isinstance(employee, Manager):
+            return self._departments[employee.department]
+        return self.unassigned
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Context manager: every change of the tree shape made inside is reported to the view
+        as one batch instead of row by row.  Batches may be nested."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_started:
+                self._batch_started = False
+                for parent in self._holes:
+                    parent.children = [child for child in parent.children if child is not None]
+                    self._renumber(parent, 0)
+                self._holes.clear()
+                self.view.end_batch()
+                self._batch_removed.clear()
+
+    def _batching(self) -> bool:
+        """Returns True inside batch(), telling the view once that a batch started."""
+        if not self._batch_depth:
+            return False
+        if not self._batch_started:
+            self._batch_started = True
+            self.view.begin_batch()
+        return True
+
+    def _move(self, node: OrgNode, parent: OrgNode) -> None:
+        """Moves node (with its whole subtree) under parent."""
+        if node.parent is parent:
+            return
+        if self._batching():
+            self._detach(node)
+            self._attach(node, parent)
+        else:
+            self.view.begin_move(node, parent, len(parent.children))
+            self._detach(node)
+            self._attach(node, parent)
+            self.view.end_move()
+        self.view.totals_changed()
+
+    def add_all(self, employees: Iterable[Employee]) -> None:
+        """Places every employee not yet in the chart under its role, department or the
+        unassigned group."""
+        groups: Dict[OrgNode, List[Employee]] = {}
+        for employee in employees:
+            if employee not in self._nodes:
+                groups.setdefault(self._home(employee), []).append(employee)
+        if not groups:
+            return
+        batching = self._batching()
+        for parent, group in groups.items():
+            if not batching:
+                first = len(parent.children)
+                self.view.begin_insert(parent, first, first + len(group) - 1)
+            for employee in group:
+                self._nodes[employee] = self._attach(OrgNode(employee.name, employee), parent)
+            if not batching:
+                self.view.end_insert()
+        self.view.totals_changed()
+
+    def add(self, employee: Employee) -> None:
+        """Places one employee in the chart."""
+        self.add_all([employee])
+
+    def remove_all(self, employees: Iterable[Employee]) -> None:
+        """Takes every employee out of the chart; a removed manager's reports become unassigned."""
+        nodes = [self._nodes.pop(e) for e in employees if e in self._nodes]
+        if not nodes:
+            return
+        if len(nodes) == 1 and not nodes[0].children and not self._batching():
+            node = nodes[0]
+            self.view.begin_remove(node.parent, node.row, node.row)
+            self._detach(node)
+            self.view.end_remove()
+            self.view.totals_changed()
+            return
+        with self.batch():
+            self._batching()
+            for node in nodes:
+                for child in node.children:
+                    if child is not None:
+                        self._move(child, self.unassigned)
+                self._detach(node)
+            self._batch_removed.extend(nodes)
+        self.view.totals_changed()
+
+    def remove(self, employee: Employee) -> None:
+        """Takes one employee out of the chart."""
+        self.remove_all([employee])
+
+    def assign(self, employee: Hourly, manager: Optional[Manager]) -> None:
+        """Makes an hourly employee report to manager (None to unassign).
+        Raises ValueError if employee is not Hourly or manager is not a Manager in the chart."""
+        if not isinstance(employee, Hourly) or employee not in self._nodes:
+            raise ValueError("Only hourly employees in the chart can be assigned a manager")
+        if manager is None:
+            self._move(self._nodes[employee], self.unassigned)
+            return
+        if not isinstance(manager, Manager) or manager not in self._nodes:
+            raise ValueError("Invalid manager")
+        self._move(self._nodes[employee], self._nodes[manager])
+
+    def assign_all(self, employees: Iterable[Hourly], manager: Optional[Manager]) -> None:
+        """Makes every hourly employee report to manager (None to unassign), as one batch."""
+        with self.batch():
+            for employee in employees:
+                self.assign(employee, manager)
+
+    def manager_of(self, employee: Employee) -> Optional[Manager]:
+        """Returns the manager an hourly employee reports to, or None."""
+        parent = self._nodes[employee].parent
+        return parent.employee if parent is not None and isinstance(parent.employee, Manager) else None
+
+    def on_change(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback keeping totals and placement current."""
+        node = self._nodes.get(employee)
+        if node is None or old == new:
+            return
+        if field in ("yearly", "hourly"):
+            pay = employee.calc_pay()
+            difference = pay - node.own_pay
+            node.own_pay = pay
+            self._propagate(node, 0, difference)
+            self.view.totals_changed()
+        elif field == "role" or field == "department":
+            self._move(node, self._home(employee))
+        elif field == "name":
+            node.label = new
+            self._dirty.add(node)
+            self.view.totals_changed()
+
+    def take_dirty(self) -> Set[OrgNode]:
+        """Returns the nodes whose totals or labels changed since the last call, and forgets them."""
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def read_reporting_lines(self, file_path: str, employees: Iterable[Employee]) -> None:
+        """Reads "employee email,manager email" rows and assigns hourly employees to managers.
+        Rows naming unknown employees are ignored."""
+        if not os.path.exists(file_path):
+            return
+        by_email: Dict[str, Employee] = {}
+        for employee in employees:
+            by_email.setdefault(employee.email, employee)
+        with open(file_path) as datafile, self.batch():
+            for row in csv.reader(datafile):
+                if len(row) != 2:
+                    continue
+                employee, manager = by_email.get(row[0]), by_email.get(row[1])
+                if isinstance(employee, Hourly) and isinstance(manager, Manager):
+                    self.assign(employee, manager)
+
+    def reporting_lines(self) -> List[str]:
+        """Returns one "employee email,manager email" CSV line per hourly employee with a manager."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for employee, node in self._nodes.items():
+            if isinstance(node.parent.employee, Manager):
+                writer.writerow([employee.email, node.parent.employee.email])
+        return buffer.getvalue().splitlines()
@@ -0,0 +1,163 @@
+"""Lightweight instrumentation for the HR Management System
+Timing spans and counters around the hot paths (loading, image checks, pixmap
+decoding, table formatting).  Profiling is off unless the HR_PROFILE environment
+variable is set or the app is started with --profile; while off, span() hands
+back one shared do-nothing context manager so the cost is a global lookup and
+a call.  Collected data can be viewed in the Help > Performance panel or dumped
+as a Chrome trace (chrome://tracing, Perfetto) for offline analysis.
+
+    HR_PROFILE=1 python gui_student.py
+    HR_PROFILE=trace.json python gui_student.py     # also dumps a trace on exit
+    python gui_student.py --profile=trace.json
+"""
+
+import atexit
+import collections
+import json
+import os
+import threading
+import time
+from typing import *
+
+# Maximum number of individual span events kept for the trace file; older ones are dropped
+MAX_EVENTS: int = 200_000
+
+ENABLED: bool = False
+_trace_path: Optional[str] = None
+_lock = threading.Lock()
+# name -> [count, total ns, max ns]
+_spans: Dict[str, List[int]] = {}
+_counters: Dict[str, int] = collections.defaultdict(int)
+_events: Deque[Tuple[str, int, int, int]] = collections.deque(maxlen=MAX_EVENTS)
+_origin_ns: int = time.perf_counter_ns()
+
+
+class _NullSpan:
+    """Context manager returned by span() while profiling is off.  Does nothing."""
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Context manager timing a single named region while profiling is on."""
+    __slots__ = ("_name", "_start")
+
+    def __init__(self, name: str) -> None:
+        self._name: str = name
+        self._start: int = 0
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        end = time.perf_counter_ns()
+        record(self._name, self._start, end - self._start)
+
+
+def span(name: str) -> ContextManager:
+    """Accepts a span name as a str.
+    Returns a context manager timing the enclosed block, or a no-op one when profiling is off."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def record(name: str, start_ns: int, duration_ns: int) -> None:
+    """Adds one finished span to the statistics and the trace buffer."""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            _spans[name] = [1, duration_ns, duration_ns]
+        else:
+            stats[0] += 1
+            stats[1] += duration_ns
+            if duration_ns > stats[2]:
+                stats[2] = duration_ns
+        _events.append((name, start_ns, duration_ns, threading.get_ident()))
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds amount to the named counter.  Does nothing when profiling is off."""
+    if ENABLED:
+        with _lock:
+            _counters[name] += amount
+
+
+def enable(trace_path: Optional[str] = None) -> None:
+    """Turns profiling on.  If trace_path is given, a Chrome trace is written there on exit."""
+    global ENABLED, _trace_path
+    ENABLED = True
+    if trace_path and _trace_path is None:
+        atexit.register(lambda: dump(_trace_path))
+    if trace_path:
+        _trace_path = trace_path
+
+
+def disable() -> None:
+    """Turns profiling off.  Already collected data is kept."""
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    """Drops all collected spans, counters and trace events."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _events.clear()
+
+
+def stats() -> List[Dict[str, Any]]:
+    """Returns one dict per span name (count, total/mean/max in ms), slowest total first."""
+    with _lock:
+        rows = [{"name": name, "count": value[0], "total_ms": value[1] / 1e6,
+                 "mean_ms": value[1] / value[0] / 1e6, "max_ms": value[2] / 1e6}
+                for name, value in _spans.items()]
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def counters() -> Dict[str, int]:
+    """Returns a copy of all counters."""
+    with _lock:
+        return dict(_counters)
+
+
+def dump(file_path: str) -> None:
+    """Writes everything collected so far to file_path in Chrome trace event format,
+    with the summary statistics and counters stored alongside under "otherData"."""
+    pid = os.getpid()
+    with _lock:
+        events = [{"name": name, "ph": "X", "ts": (start - _origin_ns) / 1000, "dur": duration / 1000,
+                   "pid": pid, "tid": tid} for name, start, duration, tid in _events]
+        now = (time.perf_counter_ns() - _origin_ns) / 1000
+        events.extend({"name": name, "ph": "C", "ts": now, "pid": pid, "args": {"value": value}}
+                      for name, value in _counters.items())
+    with open(file_path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                   "otherData": {"stats": stats(), "counters": counters()}}, file)
+
+
+def configure(argv: List[str]) -> List[str]:
+    """Enables profiling from the HR_PROFILE environment variable or a --profile[=trace.json]
+    command line flag.  Returns argv with the flag removed so Qt never sees it."""
+    setting = os.environ.get("HR_PROFILE", "")
+    if setting and setting != "0":
+        enable(setting if setting.endswith(".json") else None)
+    remaining = []
+    for argument in argv:
+        if argument == "--profile":
+            enable()
+        elif argument.startswith("--profile="):
+            enable(argument.split("=", 1)[1])
+        else:
+            remaining.append(argument)
+    return remaining
@@ -0,0 +1,122 @@
+"""Content-addressed portrait store
+Images given in the employee form are not referenced in place.  They are hashed,
+shrunk to fit MAX_SIZE x MAX_SIZE, re-encoded as JPEG and written once to
+STORE_DIR under the SHA-256 of the original file, so the same upload used by
+many employees is stored and decoded at most once, and no portrait on disk is
+ever larger than what the form displays.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import *
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PyQt6.QtGui import QImage, QPainter, QColor
+
+from autosave import target_mode
+from commands import ChangeImage
+from employee import *
+
+# Relative like Employee.IMAGE_PLACEHOLDER so saved rosters stay portable
+STORE_DIR: str = "./images/store"
+# The employee form shows portraits at 300x300
+MAX_SIZE: int = 300
+JPEG_QUALITY: int = 85
+_CHUNK: int = 1 << 16
+
+
+def file_hash(file_path: str) -> str:
+    """Returns the hex SHA-256 of the file at file_path, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stored_path(digest: str, store_dir: str = STORE_DIR) -> str:
+    """Returns where the portrait with the given hash lives; fanned out over 256 folders."""
+    return f"{store_dir}/{digest[:2]}/{digest}.jpg"
+
+
+def is_stored(image: str, store_dir: str = STORE_DIR) -> bool:
+    """Returns True if image is a path inside the store."""
+    return os.path.normpath(image).startswith(os.path.normpath(store_dir) + os.sep)
+
+
+def normalize(file_path: str) -> bytes:
+    """Decodes the image at file_path, scales it down to fit MAX_SIZE x MAX_SIZE (never up),
+    flattens any transparency onto white and returns it encoded as JPEG.
+    Raises ValueError if the file is not a readable image."""
+    image = QImage(file_path)
+    if image.isNull():
+        raise ValueError("Invalid image")
+    if image.width() > MAX_SIZE or image.height() > MAX_SIZE:
+        image = image.scaled(MAX_SIZE, MAX_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    flat = QImage(image.size(), QImage.Format.Format_RGB32)
+    flat.fill(QColor("white"))
+    painter = QPainter(flat)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if not flat.save(buffer, "JPG", JPEG_QUALITY):
+        raise ValueError("Invalid image")
+    buffer.close()
+    return bytes(data)
+
+
+def ingest(file_path: str, store_dir: str = STORE_DIR) -> str:
+    """Accepts the path of any image file.
+    Returns the path of its normalised copy in the store, creating it only if this
+    exact file content has not been ingested before.  Paths already in the store and
+    the placeholder are returned unchanged.
+    Raises ValueError if the file does not exist or is not a readable image."""
+    if file_path == Employee.IMAGE_PLACEHOLDER or is_stored(file_path, store_dir):
+        return file_path
+    if not os.path.isfile(file_path):
+        raise ValueError("Invalid image")
+    target = stored_path(file_hash(file_path), store_dir)
+    if os.path.exists(target):
+        return target
+    data = normalize(file_path)
+    folder = os.path.dirname(target)
+    os.makedirs(folder, exist_ok=True)
+    # write to a temporary file and rename so a crash never leaves half a portrait in the store
+    handle, temporary = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        # mkstemp creates the file private (0600); stored portraits get a normal file's mode
+        os.chmod(temporary, target_mode(target))
+        os.replace(temporary, target)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return target
+
+
+def migrate(employees: Iterable[Employee], store_dir: str = STORE_DIR) -> List[ChangeImage]:
+    """Ingests every employee's portrait (originals are left on disk).
+    Employees whose image cannot be read, or is already stored, are skipped.
+    Returns ChangeImage commands pointing the rest at their stored copies, to be run
+    through a CommandLog so the move can be undone."""
+    # original path -> stored path ("" if unreadable), so a path many employees share is hashed once
+    stored: Dict[str, str] = {}
+    changes = []
+    for employee in employees:
+        image = stored.get(employee.image)
+        if image is None:
+            try:
+                image = ingest(employee.image, store_dir)
+            except ValueError:
+                image = ""
+            stored[employee.image] = image
+        if image and image != employee.image:
+            changes.append(ChangeImage(employee, image))
+    return changes
+
@@ -0,0 +1,297 @@
+"""Diff/merge import of external roster files
+A vendor file in the employee.data.csv format is compared with the roster in one
+streaming pass.  Records are matched by email (or by line number, which is the
+id number a fresh load_file gives them, so only while the roster's id numbers
+still run 1, 2, 3... in order) and compared with the employee's
+canonical data file line, which the save RowCache already holds, so unchanged
+rows, usually almost all of them, are never parsed or rebuilt.  Only the
+differences are kept, in a temporary file that moves to disk once it grows, so
+files of millions of rows import in bounded memory.  The resulting ImportPlan
+can be reviewed before apply_import() updates just the changed employees and
+works out which to add and remove.  A row that cannot be used is rejected and its employee is
+left as it is.
+"""
+
+import csv
+import datetime
+import os
+import re
+import tempfile
+from typing import *
+
+from commands import Command, CommandLog, SetField
+from employee import *
+
+EMPLOYEE_TYPES: Dict[str, type] = {cls.__name__: cls for cls in (Executive, Manager, Permanent, Temporary)}
+# keep at most this many rejected rows / example changes in memory for the summary
+MAX_SAMPLES: int = 50
+# changes are held in memory up to this many bytes, then spill to disk
+SPOOL_BYTES: int = 8 * 1024 * 1024
+_DATE = re.compile(r"datetime\.date\((\d+)[!,]\s*(\d+)[!,]\s*(\d+)\)")
+
+
+class InvalidRowException(Exception):
+    """
+    Custom exception type raised when a roster file line cannot be turned into an employee
+    """
+    def __init__(self, message: str):
+        """
+        Excepts message as a str parameter, raises an exception called
+        InvalidRowException with the message var as a message
+        """
+        super().__init__(message)
+
+
+def parse_fields(line: str) -> Tuple[type, Dict[str, Any]]:
+    """Parses a line in the employee.data.csv format without exec.
+    Returns the employee class and a dict of field name -> value.
+    Raises InvalidRowException if the line is malformed."""
+    row = next(csv.reader([line]), [])
+    if len(row) != 6 or row[0] not in EMPLOYEE_TYPES:
+        raise InvalidRowException(f"Malformed line: {line}")
+    cls = EMPLOYEE_TYPES[row[0]]
+    fields: Dict[str, Any] = {"name": row[1], "email": row[2], "image": row[3]}
+    try:
+        fields["yearly" if issubclass(cls, Salaried) else "hourly"] = float(row[4])
+        if cls is Executive:
+            fields["role"] = Role[row[5].removeprefix("Role.")]
+        elif cls is Manager:
+            fields["department"] = Department[row[5].removeprefix("Department.")]
+        else:
+            match = _DATE.fullmatch(row[5].strip())
+            if match is None:
+                raise ValueError(row[5])
+            day = datetime.date(*(int(part) for part in match.groups()))
+            fields["hired_date" if cls is Permanent else "last_day"] = day
+    except (ValueError, KeyError) as error:
+        raise InvalidRowException(f"Invalid value {error} in line: {line}")
+    return cls, fields
+
+
+def validate_fields(cls: type, fields: Dict[str, Any]) -> None:
+    """Runs the real property setters of cls on a blank object for every field.
+    Raises the setter's exception if a value is invalid."""
+    scratch = object.__new__(cls)
+    for field, value in fields.items():
+        getattr(cls, field).fset(scratch, value)
+
+
+def build_employee(cls: type, fields: Dict[str, Any]) -> Employee:
+    """Returns a new employee of type cls with the given fields."""
+    pay, extra = (fields[field] for field in ("yearly", "hourly", "role", "department", "hired_date", "last_day")
+                  if field in fields)
+    employee = cls(fields["name"], fields["email"], pay, extra)
+    employee.image = fields["image"]
+    return employee
+
+
+def _local_image(fields: Dict[str, Any], fallback: Optional[str]) -> None:
+    """Vendor files often point at images we do not have; keep fallback (or the placeholder)
+    instead of rejecting the row."""
+    if not os.path.exists(fields["image"]):
+        if fallback is None:
+            fields["image"] = Employee.IMAGE_PLACEHOLDER
+        else:
+            del fields["image"]
+
+
+class ImportPlan:
+    """
+    The differences between a roster file and the current roster.
+    Changes are stored as (kind, key, line) rows with kind "add", "update" or "remove".
+    """
+    def __init__(self, key: str):
+        """Accepts how records are matched: "email" or "id"."""
+        self.key: str = key
+        self.added: int = 0
+        self.updated: int = 0
+        self.removed: int = 0
+        self.unchanged: int = 0
+        self.rejected: int = 0
+        self.rejected_samples: List[str] = []
+        self.samples: List[Tuple[str, str, str]] = []
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+", newline="")
+        self._writer = csv.writer(self._spool)
+
+    def record(self, kind: str, key: str, line: str) -> None:
+        """Stores one change of kind "add", "update" or "remove"."""
+        if kind == "add":
+            self.added += 1
+        elif kind == "update":
+            self.updated += 1
+        else:
+            self.removed += 1
+        self._writer.writerow([kind, key, line])
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append((kind, key, line))
+
+    def reject(self, message: str) -> None:
+        """Counts one unusable row."""
+        self.rejected += 1
+        if len(self.rejected_samples) < MAX_SAMPLES:
+            self.rejected_samples.append(message)
+
+    def changes(self) -> Iterator[Tuple[str, str, str]]:
+        """Yields every stored change, streaming from the spool file."""
+        self._spool.flush()
+        self._spool.seek(0)
+        for row in csv.reader(self._spool):
+            yield row[0], row[1], row[2]
+        self._spool.seek(0, os.SEEK_END)
+
+    def __bool__(self) -> bool:
+        """Returns True if there is anything to apply."""
+        return bool(self.added or self.updated or self.removed)
+
+    def summary(self) -> str:
+        """Returns a short human readable description of the plan."""
+        return (f"{self.added} to add, {self.updated} to update, {self.removed} to remove, "
+                f"{self.unchanged} unchanged, {self.rejected} rejected")
+
+    def details(self) -> str:
+        """Returns the example changes and rejected rows, one per line."""
+        lines = [f"{kind.upper():7} {key}: {line}" for kind, key, line in self.samples]
+        if self.added + self.updated + self.removed > len(self.samples):
+            lines.append("...")
+        lines.extend(f"REJECTED {message}" for message in self.rejected_samples)
+        return "\n".join(lines)
+
+    def write_report(self, file_path: str) -> None:
+        """Writes every change as a kind,key,line CSV row for review."""
+        with open(file_path, "w", newline="") as file:
+            csv.writer(file).writerows(self.changes())
+
+    def close(self) -> None:
+        """Deletes the temporary change file."""
+        self._spool.close()
+
+
+def _index(employees: Iterable[Employee], key: str) -> Dict[str, Employee]:
+    """Returns key -> employee ("email" or "id"); with duplicate keys the last employee wins."""
+    if key == "email":
+        return {employee.email: employee for employee in employees}
+    return {str(employee.id_number): employee for employee in employees}
+
+
+def ids_follow_lines(employees: Iterable[Employee]) -> bool:
+    """Returns True if the id numbers are 1, 2, 3... in roster order, i.e. id number N is
+    still line N of the data file and matching by id is safe."""
+    return all(employee.id_number == number for number, employee in enumerate(employees, start=1))
+
+
+def plan_import(file_path: str, employees: Sequence[Employee], key: str = "email",
+                line_of: Callable[[Employee], str] = repr) -> ImportPlan:
+    """Compares the roster file at file_path with employees in one pass over the file.
+    Accepts the matching key ("email" or "id") and a function returning the data file line
+    of a local employee (e.g. a RowCache lookup, so lines are not formatted again).
+    Returns the ImportPlan; nothing is changed.
+    Raises ValueError when matching by id but the ids no longer follow the lines (see
+    ids_follow_lines), since rows would then be matched to the wrong employees, and OSError
+    or UnicodeDecodeError when the file cannot be read as UTF-8 text."""
+    if key not in ("email", "id"):
+        raise ValueError("key must be 'email' or 'id'")
+    if key == "id" and not ids_follow_lines(employees):
+        raise ValueError("The id numbers no longer match the data file lines (the roster was reloaded "
+                         "or changed since it was loaded); match by email instead")
+    # matched entries are set to None, so what is left at the end was removed
+    local: Dict[str, Optional[Employee]] = _index(employees, key)
+    plan = ImportPlan(key)
+    try:
+        _compare(file_path, local, plan, line_of)
+    except BaseException:
+        plan.close()
+        raise
+    return plan
+
+
+def _compare(file_path: str, local: Dict[str, Optional[Employee]], plan: ImportPlan,
+             line_of: Callable[[Employee], str]) -> None:
+    """Records into plan every difference between the file at file_path and the indexed
+    employees in local; see plan_import."""
+    key = plan.key
+    added: Set[str] = set()
+    with open(file_path, encoding="utf-8-sig") as file:
+        for number, raw in enumerate(file, start=1):
+            line = raw.rstrip("\r\n")
+            if not line:
+                continue
+            if key == "email":
+                # the email is the third column; avoid a full parse just to find it
+                parts = line.split(",", 3)
+                if len(parts) < 4:
+                    plan.reject(f"line {number}: malformed")
+                    continue
+                record_key = parts[2]
+            else:
+                record_key = str(number)
+            match = local.get(record_key)
+            if match is None and (record_key in local or record_key in added):
+                plan.reject(f"line {number}: duplicate {key} {record_key}")
+                continue
+            if match is not None:
+                local[record_key] = None
+                # the saved (or just loaded) line reads back as this employee, so equal text means equal data
+                current = line_of(match)
+                if line == current:
+                    plan.unchanged += 1
+                    continue
+            try:
+                cls, fields = parse_fields(line)
+                _local_image(fields, None if match is None else match.image)
+                validate_fields(cls, fields)
+            except (InvalidRowException, ValueError, InvalidRoleException, InvalidDepartmentException) as error:
+                plan.reject(f"line {number}: {error}")
+                continue
+            if match is None:
+                added.add(record_key)
+                plan.record("add", record_key, line)
+            elif canonical_line(cls, fields, match) == repr(match):
+                # written differently (e.g. "50001" vs "50001.0") but the same data
+                plan.unchanged += 1
+            else:
+                plan.record("update", record_key, line)
+    for record_key, employee in local.items():
+        if employee is not None:
+            plan.record("remove", record_key, line_of(employee))
+
+
+def canonical_line(cls: type, fields: Dict[str, Any], employee: Optional[Employee] = None) -> str:
+    """Returns the data file line an employee of type cls with fields would be saved as.
+    Fields missing from fields are taken from employee when it has the same type."""
+    scratch = object.__new__(cls)
+    if type(employee) is cls:
+        scratch.__dict__.update(employee.__dict__)
+    scratch.__dict__.update({f"_{field}": value for field, value in fields.items()})
+    return cls.__repr__(scratch)
+
+
+def apply_import(plan: ImportPlan, employees: List[Employee], log: CommandLog,
+                 description: str = "Import roster") -> Tuple[List[Employee], List[Employee]]:
+    """Applies plan to the roster list employees.  Field changes are validated and applied as
+    one batch through log; an employee whose type changed is replaced.  Adding and removing
+    employees cannot be undone, so undoing only the field changes would leave a roster that
+    is neither before nor after the import: the undo history of log is cleared instead.
+    Returns (added, removed): added employees are not in the list yet and removed ones are
+    still in it; the caller adds and takes them out, updating its views and indexes."""
+    by_key = _index(employees, plan.key)
+    commands: List[Command] = []
+    added: List[Employee] = []
+    removed: List[Employee] = []
+    for kind, record_key, line in plan.changes():
+        if kind == "remove":
+            removed.append(by_key[record_key])
+            continue
+        cls, fields = parse_fields(line)
+        current = by_key.get(record_key) if kind == "update" else None
+        _local_image(fields, None if current is None else current.image)
+        if current is not None and type(current) is cls:
+            commands.extend(SetField(current, field, value) for field, value in fields.items()
+                            if getattr(current, field) != value)
+            continue
+        if current is not None:
+            removed.append(current)
+        added.append(build_employee(cls, fields))
+    if commands:
+        log.execute(commands, description)
+    log.clear()
+    return added, removed
@@ -0,0 +1,228 @@
+"""Fuzzy employee search
+A trigram index over every employee's name and the part of their email before
+the "@" (the domain is the same for everyone, so it would only add noise).
+Typos such as "Kremit the Forg" still share most of their trigrams with the
+real name, so results are ranked by trigram similarity instead of requiring an
+exact substring.  The index listens to the Employee setters and re-indexes a
+single employee when its name or email changes.
+"""
+
+import bisect
+import collections
+import itertools
+import operator
+import re
+from typing import *
+
+from employee import *
+
+# Roughly how many candidate employees a query scores; keeps queries fast on huge rosters
+CANDIDATE_BUDGET: int = 5_000
+# alphanumeric runs, i.e. word characters without the underscore
+_WORD = re.compile(r"[^\W_]+")
+
+
+def words(text: str) -> List[str]:
+    """Returns the lower case alphanumeric words of text."""
+    return _WORD.findall(text.lower())
+
+
+def trigrams(text: str, prefix: bool = False) -> Set[str]:
+    """Returns the set of trigrams of every word in text, padded so word starts and ends count.
+    With prefix True the last word is not end-padded, so a half typed word still matches."""
+    grams = set()
+    parts = words(text)
+    for number, word in enumerate(parts):
+        padded = f"  {word}" if prefix and number == len(parts) - 1 else f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def searchable_text(name: str, email: str) -> str:
+    """Returns the text indexed for an employee: the name and the local part of the email."""
+    return f"{name} {email.split('@', 1)[0]}"
+
+
+def exact_keys(name: str, email: str) -> Set[str]:
+    """Returns the texts that count as an exact match: the name, the email and its local part."""
+    email = email.lower()
+    return {name.strip().lower(), email, email.split("@", 1)[0]}
+
+
+class TrigramIndex:
+    """
+    Maps trigrams to the id numbers of employees whose name/email contain them.
+    """
+    def __init__(self, employees: Iterable[Employee] = ()):
+        """Accepts the employees to index."""
+        # defaultdicts so add_all can look postings up with a C level map
+        self._postings: Dict[str, Set[int]] = collections.defaultdict(set)
+        self._employees: Dict[int, Employee] = {}
+        # lower case name / email / email local part -> ids, so exact matches are never missed
+        self._exact: Dict[str, Set[int]] = collections.defaultdict(set)
+        self.add_all(employees)
+
+    def __len__(self) -> int:
+        """Returns the number of indexed employees."""
+        return len(self._employees)
+
+    def __contains__(self, employee: Employee) -> bool:
+        """Returns True if this exact employee object is indexed."""
+        return self._employees.get(employee.id_number) is employee
+
+    def _insert(self, id_number: int, name: str, email: str) -> None:
+        """Adds the trigrams and exact keys of name and email to the postings of id_number."""
+        for gram in trigrams(searchable_text(name, email)):
+            self._postings[gram].add(id_number)
+        for key in exact_keys(name, email):
+            self._exact[key].add(id_number)
+
+    def _delete(self, id_number: int, name: str, email: str) -> None:
+        """Removes the trigrams and exact keys of name and email from the postings of id_number."""
+        for gram in trigrams(searchable_text(name, email)):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(id_number)
+                if not posting:
+                    del self._postings[gram]
+        for key in exact_keys(name, email):
+            ids = self._exact.get(key)
+            if ids is not None:
+                ids.discard(id_number)
+                if not ids:
+                    del self._exact[key]
+
+    def add(self, employee: Employee) -> None:
+        """Indexes employee (replacing any previous entry with the same id number)."""
+        if employee.id_number in self._employees:
+            self.remove(self._employees[employee.id_number])
+        self._employees[employee.id_number] = employee
+        self._insert(employee.id_number, employee.name, employee.email)
+
+    def add_all(self, employees: Iterable[Employee]) -> None:
+        """Indexes many employees at once, e.g. a loaded roster.  Every step maps a C function
+        over whole lists, so there is no Python loop per employee or per trigram.  Employees
+        that are already indexed are re-indexed one at a time."""
+        fresh = []
+        for employee in employees:
+            if employee.id_number in self._employees:
+                self.add(employee)
+            else:
+                fresh.append(employee)
+        ids = list(map(operator.attrgetter("id_number"), fresh))
+        names = list(map(str.lower, map(operator.attrgetter("name"), fresh)))
+        emails = list(map(str.lower, map(operator.attrgetter("email"), fresh)))
+        local_parts = list(map(operator.itemgetter(0), map(str.partition, emails, itertools.repeat("@"))))
+        self._employees.update(zip(ids, fresh))
+        # the same keys as exact_keys()
+        for keys in (map(str.strip, names), emails, local_parts):
+            collections.deque(map(set.add, map(self._exact.__getitem__, keys), ids), maxlen=0)
+        # every word of searchable_text(), padded like trigrams() pads it, with its employee's id
+        word_lists = list(map(_WORD.findall, itertools.chain(names, local_parts)))
+        padded = list(map("  {} ".format, itertools.chain.from_iterable(word_lists)))
+        owners = list(itertools.chain.from_iterable(
+            map(itertools.repeat, itertools.chain(ids, ids), map(len, word_lists))))
+        # shortest first, so the words long enough to have a trigram at position start are a suffix
+        lengths = list(map(len, padded))
+        order = sorted(range(len(padded)), key=lengths.__getitem__)
+        padded = list(map(padded.__getitem__, order))
+        owners = list(map(owners.__getitem__, order))
+        lengths.sort()
+        for start in range(lengths[-1] - 2 if lengths else 0):
+            first = bisect.bisect_left(lengths, start + 3)
+            grams = map(str.__getitem__, itertools.islice(padded, first, None),
+                        itertools.repeat(slice(start, start + 3)))
+            collections.deque(map(set.add, map(self._postings.__getitem__, grams),
+                                  itertools.islice(owners, first, None)), maxlen=0)
+
+    def remove(self, employee: Employee) -> None:
+        """Removes employee from the index if it is indexed."""
+        if employee in self:
+            self._delete(employee.id_number, employee.name, employee.email)
+            del self._employees[employee.id_number]
+
+    def on_change(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback; re-indexes one employee when its name or email changes."""
+        if field not in ("name", "email") or old == new or employee not in self:
+            return
+        name, email = employee.name, employee.email
+        if field == "name":
+            name = old
+        else:
+            email = old
+        self._delete(employee.id_number, name, email)
+        self._insert(employee.id_number, employee.name, employee.email)
+
+    def _candidates(self, grams: Set[str], inner: List[Set[str]]) -> Tuple[Set[int], Set[int]]:
+        """Returns (candidates, complete).  complete holds the ids with every trigram of inner
+        (one set of trigrams per query word), the only ids that can contain the query as a
+        substring; candidates adds ids sharing at
+        least one trigram with the query, from the rarest trigrams, until about
+        CANDIDATE_BUDGET ids have been collected."""
+        postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+        if not postings:
+            return set(), set()
+        words_required = [sorted((self._postings.get(gram, set()) for gram in word), key=len) for word in inner]
+        # the trigrams of one word mostly share their ids, so intersecting them barely shrinks
+        # the result; start with the rarest trigram of every word, smallest first (each & runs
+        # in C over the smaller set), then narrow down with the rest
+        heads = sorted((required[0] for required in words_required), key=len)
+        required = heads + sorted((posting for required in words_required for posting in required[1:]), key=len)
+        complete: Set[int] = required[0] if required else set()
+        for posting in required[1:]:
+            if not complete:
+                break
+            complete = complete & posting
+        if len(complete) > CANDIDATE_BUDGET:
+            # a very common substring (e.g. a first name): score a sample of the ids holding it
+            complete = {id_number for id_number, _ in zip(complete, range(CANDIDATE_BUDGET))}
+        candidates = set(complete)
+        for posting in postings:
+            if candidates and len(candidates) + len(posting) > CANDIDATE_BUDGET:
+                break
+            if len(posting) > CANDIDATE_BUDGET:
+                # even the rarest trigram is very common: sample it rather than scoring everyone
+                candidates.update(id_number for id_number, _ in zip(posting, range(CANDIDATE_BUDGET)))
+                break
+            candidates |= posting
+        return candidates, complete
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Employee, float]]:
+        """Accepts the text typed by the user and the maximum number of results.
+        Returns (employee, score) pairs best first; score is between 0 and 1, plus a bonus of
+        1 when the query appears in the name or email and of 2 when it is the whole name,
+        email or email local part."""
+        grams = trigrams(query, prefix=True)
+        if not grams:
+            return []
+        needle = query.strip().lower()
+        # unpadded trigrams: every one of them is in any text containing the query
+        inner = [{word[i:i + 3] for i in range(len(word) - 2)} for word in words(needle) if len(word) > 2]
+        exact = self._exact.get(needle, set())
+        candidates, complete = self._candidates(grams, inner or [grams])
+        candidates |= exact
+        size = len(grams)
+        # start possible substring and exact matches above any plain trigram count, so cutting
+        # the list down to the best few below can never drop them
+        shared: Counter = collections.Counter(dict.fromkeys(complete, size + 1))
+        shared.update(dict.fromkeys(exact, 2 * (size + 1)))
+        # set intersections and Counter.update both run in C, so no per-candidate Python loop
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                shared.update(candidates & posting)
+        results = []
+        for id_number, count in shared.most_common(limit * 5):
+            count %= size + 1
+            employee = self._employees[id_number]
+            # Jaccard similarity of the trigram sets
+            # only the few results need the size of their trigram set, so it is not stored
+            own = len(trigrams(searchable_text(employee.name, employee.email)))
+            score = count / (size + own - count)
+            if id_number in exact:
+                score += 2.0
+            elif needle in employee.name.lower() or needle in employee.email.lower():
+                score += 1.0
+            results.append((employee, score))
+        results.sort(key=lambda result: (-result[1], result[0].name))
+        return results[:limit]
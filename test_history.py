@@ -0,0 +1,76 @@
+"""Tests for the roster history: as-of queries and per-employee changes."""
+
+import datetime
+import itertools
+
+import pytest
+
+import history
+from commands import snapshot
+from employee import Employee
+from history import HistoryStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Makes every record one second later than the previous one."""
+    ticks = itertools.count(1_700_000_000)
+    monkeypatch.setattr(history.time, "time", lambda: float(next(ticks)))
+    return ticks
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A HistoryStore recording every employee edit of the test."""
+    history_store = HistoryStore(str(tmp_path / "employee.history.csv"), checkpoint_every=10)
+    monkeypatch.setattr(Employee, "LISTENERS", [history_store.on_change])
+    yield history_store
+    history_store.close()
+
+
+def roster_state(employees):
+    return {employee.email: {"type": type(employee).__name__, **snapshot(employee)} for employee in employees}
+
+
+def test_as_of_round_trip(roster, store, clock):
+    store.add_all(roster)
+    states = []
+    for number, employee in enumerate(roster * 2):
+        employee.name = f"Renamed {number}"
+        if number % 7 == 0:
+            employee.email = f"moved{number}@acme-machining.com"
+        if number % 5 == 0:
+            states.append((next(clock), roster_state(roster)))
+    store.remove(roster[0])
+    states.append((next(clock), roster_state(roster[1:])))
+    # enough deltas were written for several checkpoints in between
+    assert len(store._checkpoints) > 2
+    for moment, state in states:
+        assert store.as_of(datetime.datetime.fromtimestamp(moment)) == state
+    assert store.as_of(datetime.datetime.fromtimestamp(1_000_000_000)) == {}
+
+
+def test_history_survives_reopening(roster, store, clock, tmp_path):
+    store.add_all(roster)
+    employee = roster[3]
+    employee.name = "First Name"
+    employee.email = "first@acme-machining.com"
+    moment = next(clock)
+    store.close()
+    reopened = HistoryStore(str(tmp_path / "employee.history.csv"))
+    Employee.LISTENERS[:] = [reopened.on_change]
+    reopened.add_all(roster)
+    employee.name = "Second Name"
+    changes = [(field, value) for _, field, value in reopened.employee_history(employee.email)]
+    assert changes == [("name", "First Name"), ("email", "first@acme-machining.com"), ("name", "Second Name")]
+    assert reopened.as_of(datetime.datetime.fromtimestamp(moment))[employee.email]["name"] == "First Name"
+    reopened.close()
+
+
+def test_loading_the_same_file_again_skips_the_checkpoint(roster, store, tmp_path):
+    store.add_all(roster, "employee.data.csv")
+    store.close()
+    reopened = HistoryStore(str(tmp_path / "employee.history.csv"))
+    reopened.add_all(roster, "employee.data.csv")
+    assert len(reopened._checkpoints) == 1
+    reopened.close()
@@ -0,0 +1,58 @@
+"""Tests for planning and applying a roster import."""
+
+import pytest
+
+import roster_import
+from commands import CommandLog
+from employee import Employee, Permanent, Temporary
+
+
+@pytest.fixture(autouse=True)
+def no_listeners(monkeypatch):
+    monkeypatch.setattr(Employee, "LISTENERS", [])
+
+
+def write_vendor_file(roster):
+    """Writes vendor.csv: the roster with one of each kind of difference.
+    Returns its path and the position of the employee whose type changes."""
+    lines = list(map(repr, roster))
+    edited = lines[1].split(",")
+    edited[4] = "70.0"
+    lines[1] = ",".join(edited)
+    same = lines[2].split(",")
+    same[4] += "0"
+    lines[2] = ",".join(same)
+    retyped = next(number for number, employee in enumerate(roster) if number > 5 and isinstance(employee, Permanent))
+    lines[retyped] = lines[retyped].replace("Permanent,", "Temporary,", 1)
+    lines[0] = "garbage"
+    lines.append(lines[5])
+    lines.append("Manager,New Person,new@acme-machining.com,./images/placeholder.png,60000.0,Department.HR")
+    with open("vendor.csv", "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return "vendor.csv", retyped
+
+
+def test_plan_and_apply_import(roster):
+    vendor, retyped = write_vendor_file(roster)
+    plan = roster_import.plan_import(vendor, roster)
+    assert (plan.added, plan.removed, plan.rejected) == (1, 1, 2)
+    assert plan.updated == 2
+    assert plan.unchanged == len(roster) - 3
+    log = CommandLog()
+    added, removed = roster_import.apply_import(plan, roster, log)
+    plan.close()
+    assert roster[0] in removed
+    assert roster[1].hourly == 70.0
+    assert roster[retyped] in removed
+    assert any(isinstance(employee, Temporary) and employee.email == roster[retyped].email for employee in added)
+    assert not log.can_undo()
+    imported = [employee for employee in roster if employee not in removed] + added
+    again = roster_import.plan_import(vendor, imported)
+    assert (again.added, again.updated, again.removed) == (0, 0, 0)
+    again.close()
+
+
+def test_matching_by_id_is_refused_once_ids_drift(roster):
+    vendor, _ = write_vendor_file(roster)
+    with pytest.raises(ValueError):
+        roster_import.plan_import(vendor, roster[1:], "id")
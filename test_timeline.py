@@ -0,0 +1,43 @@
+"""Tests for the employment interval tree, checked against brute force."""
+
+import random
+
+from timeline import IntervalTree
+
+
+def brute_overlapping(spans, first, last):
+    return sorted(key for key, (start, end) in spans.items() if start <= last and end >= first)
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    spans = {}
+    for key in range(300):
+        start = rng.randrange(1000)
+        spans[key] = (start, start + rng.randrange(200))
+    tree = IntervalTree((start, end, key) for key, (start, end) in spans.items())
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.3:
+            key = rng.randrange(400)
+            start = rng.randrange(1000)
+            spans[key] = (start, start + rng.randrange(200))
+            tree.insert(*spans[key], key)
+        elif action < 0.5:
+            key = rng.randrange(400)
+            spans.pop(key, None)
+            tree.remove(key)
+        else:
+            first = rng.randrange(-50, 1250)
+            last = first + rng.randrange(100)
+            assert sorted(tree.overlapping(first, last)) == brute_overlapping(spans, first, last)
+            assert sorted(tree.stabbing(first)) == brute_overlapping(spans, first, first)
+        assert len(tree) == len(spans)
+
+
+def test_interval_tree_limit_returns_matching_keys():
+    tree = IntervalTree((number, number + 10, number) for number in range(100))
+    found = tree.stabbing(50, limit=5)
+    assert len(found) == 5
+    assert set(found) <= set(range(40, 51))
+    assert sorted(tree.stabbing(50, limit=100)) == list(range(40, 51))
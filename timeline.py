@@ -0,0 +1,284 @@
+"""Employment timeline index
+Each employee is employed over a span of dates:
+    Permanent   from hired_date onwards
+    Temporary   up to and including last_day
+    Salaried    always (there are no dates on record for them)
+Spans are kept in an interval tree (a treap ordered by start date where every
+node also stores the latest end date below it) so "who is employed on this
+date" and "who overlaps this range" only visit matching branches.  Sorted lists
+of start and end dates answer counts and headcount-over-time series with
+binary searches, and "whose span ends/starts between two dates" with slices.
+The index listens to the hired_date/last_day setters and moves one span per edit.
+"""
+
+import bisect
+import datetime
+import random
+from typing import *
+
+from employee import *
+
+# Open ends of a span, as date ordinals
+FIRST_DAY: int = datetime.date.min.toordinal()
+LAST_DAY: int = datetime.date.max.toordinal()
+
+
+def employment_span(employee: Employee) -> Tuple[int, int]:
+    """Returns the first and last day (inclusive, as date ordinals) an employee is employed."""
+    if isinstance(employee, Permanent):
+        return employee.hired_date.toordinal(), LAST_DAY
+    if isinstance(employee, Temporary):
+        return FIRST_DAY, employee.last_day.toordinal()
+    return FIRST_DAY, LAST_DAY
+
+
+class _Node:
+    """One span in the treap."""
+    __slots__ = ("start", "end", "key", "priority", "left", "right", "max_end")
+
+    def __init__(self, start: int, end: int, key: int, priority: float):
+        self.start: int = start
+        self.end: int = end
+        self.key: int = key
+        self.priority: float = priority
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.max_end: int = end
+
+    def update(self) -> None:
+        """Recomputes max_end from this node and its children."""
+        max_end = self.end
+        if self.left is not None and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+def _split(node: Optional[_Node], order: Tuple[int, int]) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Splits a treap into the nodes ordered before order and the rest."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < order:
+        node.right, right = _split(node.right, order)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, order)
+    node.update()
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """Joins two treaps where every node of left is ordered before every node of right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+class IntervalTree:
+    """
+    Closed integer intervals [start, end] identified by a unique int key.
+    Insert and remove are O(log n) expected; stabbing and overlap queries are O(log n + k).
+    """
+    def __init__(self, intervals: Iterable[Tuple[int, int, int]] = ()):
+        """Accepts (start, end, key) triples and builds a balanced tree from them in one pass."""
+        self._spans: Dict[int, Tuple[int, int]] = {}
+        self._root: Optional[_Node] = None
+        self._random = random.Random()
+        items = sorted((start, key, end) for start, end, key in intervals)
+        for start, key, end in items:
+            self._spans[key] = (start, end)
+        self._root = self._build(items, 0, len(items), 1.0)
+
+    def _build(self, items: List[Tuple[int, int, int]], low: int, high: int, ceiling: float) -> Optional[_Node]:
+        """Builds a balanced subtree of items[low:high]; priorities shrink with depth so the
+        result is a valid treap later inserts can rebalance."""
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        start, key, end = items[middle]
+        priority = ceiling * (0.5 + self._random.random() / 2)
+        node = _Node(start, end, key, priority)
+        node.left = self._build(items, low, middle, priority)
+        node.right = self._build(items, middle + 1, high, priority)
+        node.update()
+        return node
+
+    def __len__(self) -> int:
+        """Returns the number of intervals."""
+        return len(self._spans)
+
+    def __contains__(self, key: int) -> bool:
+        """Returns True if an interval with key is stored."""
+        return key in self._spans
+
+    def insert(self, start: int, end: int, key: int) -> None:
+        """Adds [start, end] under key, replacing any interval already stored under key."""
+        if key in self._spans:
+            self.remove(key)
+        self._spans[key] = (start, end)
+        left, right = _split(self._root, (start, key))
+        self._root = _merge(_merge(left, _Node(start, end, key, self._random.random())), right)
+
+    def remove(self, key: int) -> None:
+        """Removes the interval stored under key, if any."""
+        span = self._spans.pop(key, None)
+        if span is None:
+            return
+        left, rest = _split(self._root, (span[0], key))
+        _, right = _split(rest, (span[0], key + 1))
+        self._root = _merge(left, right)
+
+    def overlapping(self, first: int, last: int, limit: Optional[int] = None) -> List[int]:
+        """Returns the keys of every interval sharing at least one point with [first, last],
+        or only the first limit of them found."""
+        found = []
+        stack = [self._root]
+        while stack and len(found) != limit:
+            node = stack.pop()
+            # nothing below ends late enough
+            if node is None or node.max_end < first:
+                continue
+            stack.append(node.left)
+            if node.start <= last:
+                if node.end >= first:
+                    found.append(node.key)
+                # the right subtree only starts later, so it is useless once past last
+                stack.append(node.right)
+        return found
+
+    def stabbing(self, point: int, limit: Optional[int] = None) -> List[int]:
+        """Returns the keys of every interval containing point (at most limit of them)."""
+        return self.overlapping(point, point, limit)
+
+
+class EmploymentIndex:
+    """
+    Date index over the employment span of every employee in a roster.
+    """
+    def __init__(self, employees: Iterable[Employee] = ()):
+        """Accepts the employees to index."""
+        self._employees: Dict[int, Employee] = {}
+        self._rebuild(employees)
+
+    def _rebuild(self, employees: Iterable[Employee]) -> None:
+        """Indexes employees together with everything already indexed, building the tree
+        and sorted lists in one O(n log n) pass."""
+        for employee in employees:
+            self._employees[employee.id_number] = employee
+        spans = [(*employment_span(employee), key) for key, employee in self._employees.items()]
+        self._tree = IntervalTree(spans)
+        self._starts: List[Tuple[int, int]] = sorted((start, key) for start, _, key in spans)
+        self._ends: List[Tuple[int, int]] = sorted((end, key) for _, end, key in spans)
+
+    def add_all(self, employees: Iterable[Employee]) -> None:
+        """Indexes many employees; large batches (such as loading a file) rebuild the index
+        instead of inserting one span at a time."""
+        employees = [e for e in employees if e not in self]
+        if len(employees) * 8 > len(self._employees):
+            for employee in employees:
+                # drop stale entries that share an id number
+                self._employees.pop(employee.id_number, None)
+            self._rebuild(employees)
+        else:
+            for employee in employees:
+                self.add(employee)
+
+    def __len__(self) -> int:
+        """Returns the number of indexed employees."""
+        return len(self._employees)
+
+    def __contains__(self, employee: Employee) -> bool:
+        """Returns True if this exact employee object is indexed."""
+        return self._employees.get(employee.id_number) is employee
+
+    def _insert(self, key: int, start: int, end: int) -> None:
+        """Stores one span in the tree and the sorted lists."""
+        self._tree.insert(start, end, key)
+        bisect.insort(self._starts, (start, key))
+        bisect.insort(self._ends, (end, key))
+
+    def _delete(self, key: int, start: int, end: int) -> None:
+        """Removes one span from the tree and the sorted lists."""
+        self._tree.remove(key)
+        for values, item in ((self._starts, (start, key)), (self._ends, (end, key))):
+            position = bisect.bisect_left(values, item)
+            if position < len(values) and values[position] == item:
+                del values[position]
+
+    def add(self, employee: Employee) -> None:
+        """Indexes employee (replacing any previous entry with the same id number)."""
+        if employee.id_number in self._employees:
+            self.remove(self._employees[employee.id_number])
+        self._employees[employee.id_number] = employee
+        self._insert(employee.id_number, *employment_span(employee))
+
+    def remove(self, employee: Employee) -> None:
+        """Removes employee from the index if it is indexed."""
+        if employee in self:
+            self._delete(employee.id_number, *employment_span(employee))
+            del self._employees[employee.id_number]
+
+    def on_change(self, employee: Employee, field: str, old, new) -> None:
+        """Employee.LISTENERS callback moving one span when hired_date or last_day is edited."""
+        if field not in ("hired_date", "last_day") or old == new or employee not in self:
+            return
+        start, end = employment_span(employee)
+        if field == "hired_date":
+            self._delete(employee.id_number, old.toordinal(), end)
+        else:
+            self._delete(employee.id_number, start, old.toordinal())
+        self._insert(employee.id_number, start, end)
+
+    def _lookup(self, keys: Iterable[int]) -> List[Employee]:
+        """Returns the employees with the given ids, ordered by id number."""
+        return [self._employees[key] for key in sorted(keys)]
+
+    def employed_on(self, day: datetime.date, limit: Optional[int] = None) -> List[Employee]:
+        """Returns every employee employed on day, or only limit of them (e.g. to list a
+        sample without walking a huge roster; headcount_on gives the full count)."""
+        return self._lookup(self._tree.stabbing(day.toordinal(), limit))
+
+    def employed_during(self, first: datetime.date, last: datetime.date) -> List[Employee]:
+        """Returns every employee employed on at least one day from first to last."""
+        return self._lookup(self._tree.overlapping(first.toordinal(), last.toordinal()))
+
+    def headcount_on(self, day: datetime.date) -> int:
+        """Returns how many employees are employed on day, in O(log n):
+        spans started on or before day minus spans that already ended."""
+        point = day.toordinal()
+        started = bisect.bisect_right(self._starts, (point, float("inf")))
+        ended = bisect.bisect_left(self._ends, (point, float("-inf")))
+        return started - ended
+
+    def headcount_series(self, first: datetime.date, last: datetime.date,
+                         step: datetime.timedelta = datetime.timedelta(days=30)) -> List[Tuple[datetime.date, int]]:
+        """Returns (date, headcount) pairs from first to last every step."""
+        series = []
+        day = first
+        while day <= last:
+            series.append((day, self.headcount_on(day)))
+            day += step
+        return series
+
+    def _between(self, values: List[Tuple[int, int]], first: datetime.date, last: datetime.date) -> List[Employee]:
+        """Returns the employees whose sorted date in values lies from first to last, by date."""
+        low = bisect.bisect_left(values, (first.toordinal(), float("-inf")))
+        high = bisect.bisect_right(values, (last.toordinal(), float("inf")))
+        return [self._employees[key] for _, key in values[low:high]]
+
+    def ending_between(self, first: datetime.date, last: datetime.date) -> List[Employee]:
+        """Returns the temporary employees whose last day is from first to last, soonest first."""
+        return self._between(self._ends, first, last)
+
+    def starting_between(self, first: datetime.date, last: datetime.date) -> List[Employee]:
+        """Returns the permanent employees hired from first to last, earliest first."""
+        return self._between(self._starts, first, last)